@@ -0,0 +1,108 @@
+import re
+import time
+import asyncio
+import hashlib
+import logging
+
+from cache import TTLCache
+from llm import PROMPT_RESUME_CHARS
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """Нормализация текста перед хешированием: регистр и пробельные символы."""
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def analysis_key(resume_text, vacancy_data):
+    """(resume_hash, vacancy_hash) для той части резюме, которую видит модель."""
+    return content_hash(resume_text[:PROMPT_RESUME_CHARS]), content_hash(vacancy_data)
+
+
+class AnalysisCache:
+    """Повторное использование оценок по хешу содержимого: память (LRU) перед таблицей resumes."""
+
+    def __init__(self, db, memory_size=1024, memory_ttl=3600.0):
+        self.db = db
+        self.memory = TTLCache(maxsize=memory_size, ttl=memory_ttl) if memory_size > 0 else None
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.computed = 0
+        self.llm_seconds = 0.0
+        self._inflight = {}
+
+    async def get(self, key):
+        """Сохранённые (score, analysis) или None."""
+        if self.memory is not None:
+            cached = self.memory.get(key)
+            if cached is not None:
+                self.memory_hits += 1
+                return cached
+        try:
+            row = await self.db.resumes.find_analysis(*key)
+        except Exception as e:
+            logger.error(f"Analysis cache lookup failed: {e}")
+            row = None
+        if row is None:
+            return None
+        self.db_hits += 1
+        cached = (row["score"], row["analysis"])
+        if self.memory is not None:
+            self.memory.set(key, cached)
+        return cached
+
+    async def get_or_compute(self, resume_text, vacancy_data, compute):
+        """(score, analysis, key): из кэша или через compute(); одинаковые запросы в полёте объединяются.
+
+        Исключение из compute не кэшируется и передаётся всем ожидающим.
+        """
+        key = analysis_key(resume_text, vacancy_data)
+        cached = await self.get(key)
+        if cached is not None:
+            logger.info(f"Analysis cache hit for resume {key[0][:12]}")
+            return (*cached, key)
+        if key in self._inflight:
+            self.coalesced += 1
+            return (*await asyncio.shield(self._inflight[key]), key)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        started = time.perf_counter()
+        try:
+            result = await compute()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # ожидающих может не быть — не логировать "never retrieved"
+            raise
+        else:
+            future.set_result(result)
+            self.computed += 1
+            self.llm_seconds += time.perf_counter() - started
+            # Ответ без оценки не кэшируем: подставленная 5.0 не должна закрепиться за резюме
+            if self.memory is not None and result[0] is not None:
+                self.memory.set(key, result)
+        finally:
+            del self._inflight[key]
+        return (*result, key)
+
+    def stats(self):
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.coalesced + self.misses
+        avg_llm = self.llm_seconds / self.computed if self.computed else 0.0
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            # Присоединились к такому же запросу в полёте: вызов LLM сэкономлен, но ждали его целиком
+            "coalesced": self.coalesced,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "llm_calls_saved": hits + self.coalesced,
+            "llm_seconds_saved": round(hits * avg_llm, 2),
+        }
@@ -1,22 +1,123 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
+from telegram import Update
+import os
 import logging
-from bot import get_application
+from bot import get_application, init_application, shutdown_application
+from update_queue import UpdateDeduplicator, UpdateQueue
+import extraction
+import metrics
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# inline — апдейт обрабатывается до ответа Telegram; queue — ответ сразу, обработка в фоновых воркерах
+WEBHOOK_MODE = os.getenv("WEBHOOK_MODE", "inline")
+WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+
+dedup = UpdateDeduplicator(
+    maxsize=int(os.getenv("UPDATE_DEDUP_SIZE", "10000")),
+    ttl=float(os.getenv("UPDATE_DEDUP_TTL", "3600"))
+)
+update_queue = None
+
+async def process_update(update):
+    application = await init_application()
+    metrics.UPDATES_IN_FLIGHT.inc()
+    try:
+        await application.process_update(update)
+        metrics.UPDATES_TOTAL.inc(status="ok")
+    except Exception:
+        metrics.UPDATES_TOTAL.inc(status="error")
+        raise
+    finally:
+        metrics.UPDATES_IN_FLIGHT.dec()
+
+def update_key(update):
+    """Ключ упорядочивания в очереди: чат (диалог ConversationHandler), иначе пользователь."""
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return update.update_id
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global update_queue
+    # Application собирается и инициализируется один раз на холодный старт, дальше переиспользуется
+    await init_application()
+    metrics.register_stats("updates", lambda: {"duplicates": dedup.duplicates}, counters=("duplicates",))
+    if WEBHOOK_MODE == "queue":
+        # Альбомы собираются в фоне, не занимая воркер чата (см. bot.handle_resume)
+        get_application().bot_data["media_groups_in_background"] = True
+        update_queue = UpdateQueue(
+            process_update,
+            workers=int(os.getenv("UPDATE_WORKERS", "4")),
+            maxsize=int(os.getenv("UPDATE_QUEUE_SIZE", "100"))
+        )
+        await update_queue.start()
+        metrics.register_stats("update_queue", update_queue.stats, counters=("processed", "failed", "rejected"))
+    yield
+    if update_queue is not None:
+        await update_queue.stop()
+    await shutdown_application()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/webhook")
 async def webhook(request: Request):
+    if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+        raise HTTPException(status_code=403, detail="Invalid secret token")
     try:
         data = await request.json()
-        logger.info("Received webhook request")
-        application = get_application()
-        update = application.bot.parse_update(data)
-        await application.process_update(update)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if not isinstance(data, dict) or not isinstance(data.get("update_id"), int):
+        raise HTTPException(status_code=400, detail="Not a Telegram update")
+    update_id = data["update_id"]
+    if dedup.seen(update_id):
+        logger.info(f"Dropping duplicate update {update_id}")
+        return {"status": "duplicate"}
+    try:
+        logger.info(f"Received webhook request, update {update_id}")
+        application = await init_application()
+        update = Update.de_json(data, application.bot)
+        if update_queue is not None:
+            if not update_queue.submit(update, key=update_key(update)):
+                # Очередь заполнена: Telegram доставит апдейт повторно позже
+                dedup.forget(update_id)
+                logger.warning(f"Update queue full, rejecting update {update_id}")
+                raise HTTPException(status_code=503, detail="Update queue is full", headers={"Retry-After": "5"})
+            return {"status": "queued"}
+        await process_update(update)
         return {"status": "ok"}
+    except HTTPException:
+        raise
     except Exception as e:
+        dedup.forget(update_id)
         logger.error(f"Webhook error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/stats")
+async def stats():
+    application = get_application()
+    return {
+        "db": application.bot_data["db"].pool_stats(),
+        "role_cache": application.bot_data["role_cache"].stats(),
+        "llm": application.bot_data["llm"].stats(),
+        "analysis_cache": application.bot_data["analysis_cache"].stats(),
+        "extraction": extraction.stats.as_dict(),
+        "updates": {
+            "mode": WEBHOOK_MODE,
+            "duplicates": dedup.duplicates,
+            **(update_queue.stats() if update_queue is not None else {}),
+        },
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if not metrics.is_enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
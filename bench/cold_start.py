@@ -0,0 +1,87 @@
+"""Замер холодного старта webhook: импорт api.webhook и сборка Application в свежем процессе.
+
+Пример: python -m bench.cold_start --runs 10 --max-import-ms 800
+Код возврата 1, если при старте импортированы тяжёлые модули или превышен порог.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны загружаться до первого резюме
+HEAVY_MODULES = ["PyPDF2", "docx", "lxml", "numpy", "asyncpg"]
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import api.webhook
+imported = time.perf_counter()
+api.webhook.get_application()
+built = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "build_ms": (built - imported) * 1000,
+    "heavy": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def probe():
+    env = dict(os.environ, TELEGRAM_TOKEN=os.getenv("TELEGRAM_TOKEN", "123:cold-start-probe"))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(top):
+    """Самые дорогие модули по `python -X importtime` (накопительное время, мс)."""
+    env = dict(os.environ, TELEGRAM_TOKEN=os.getenv("TELEGRAM_TOKEN", "123:cold-start-probe"))
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.webhook"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if "." not in name.strip():
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="сколько самых дорогих пакетов показать")
+    parser.add_argument("--max-import-ms", type=float, default=0, help="порог медианы импорта (0 — без порога)")
+    args = parser.parse_args()
+
+    results = [probe() for _ in range(args.runs)]
+    imports = [r["import_ms"] for r in results]
+    builds = [r["build_ms"] for r in results]
+    heavy = sorted({name for r in results for name in r["heavy"]})
+    print(f"import api.webhook: median {statistics.median(imports):7.1f} ms  min {min(imports):7.1f} ms")
+    print(f"get_application():  median {statistics.median(builds):7.1f} ms  min {min(builds):7.1f} ms")
+    print(f"heavy modules at startup: {', '.join(heavy) or 'none'}")
+    print("slowest top-level packages:")
+    for ms, name in slowest_imports(args.top):
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: {', '.join(heavy)} must be imported lazily")
+        failed = True
+    if args.max_import_ms and statistics.median(imports) > args.max_import_ms:
+        print(f"FAIL: import median exceeds {args.max_import_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
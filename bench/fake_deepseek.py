@@ -0,0 +1,66 @@
+"""Локальная заглушка DeepSeek /chat/completions для тестов и бенчмарков.
+
+Запуск: uvicorn bench.fake_deepseek:app --port 8081
+Задержка и доля ошибок задаются FAKE_DEEPSEEK_LATENCY и FAKE_DEEPSEEK_ERROR_RATE.
+При "stream": true ответ отдаётся SSE-потоком: первый фрагмент через FAKE_DEEPSEEK_FIRST_TOKEN
+секунд, остальные равномерно до полной задержки.
+"""
+import os
+import json
+import random
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+app.state.latency = float(os.getenv("FAKE_DEEPSEEK_LATENCY", "0.5"))
+app.state.error_rate = float(os.getenv("FAKE_DEEPSEEK_ERROR_RATE", "0"))
+app.state.first_token = float(os.getenv("FAKE_DEEPSEEK_FIRST_TOKEN", "0.2"))
+app.state.requests = 0
+
+
+def fake_answer(prompt):
+    """Детерминированный ответ модели: оценка зависит от длины промпта."""
+    score = (len(prompt) % 100) / 10
+    return f"Оценка: {score:.1f}. Отличный кандидат с сильным опытом! Стоит пригласить на интервью. 😄"
+
+
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    app.state.requests += 1
+    streaming = bool(payload.get("stream"))
+    await asyncio.sleep(min(app.state.first_token, app.state.latency) if streaming else app.state.latency)
+    if random.random() < app.state.error_rate:
+        return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers={"Retry-After": "0.1"})
+    prompt = payload["messages"][-1]["content"]
+    content = fake_answer(prompt)
+    if streaming:
+        return StreamingResponse(stream_answer(payload, prompt, content), media_type="text/event-stream")
+    return {
+        "id": f"fake-{app.state.requests}",
+        "object": "chat.completion",
+        "model": payload.get("model", "deepseek-chat"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+    }
+
+
+async def stream_answer(payload, prompt, content):
+    """События SSE в формате DeepSeek: фрагменты delta, usage (если запрошен) и [DONE]."""
+    words = content.split(" ")
+    pause = max(0.0, app.state.latency - app.state.first_token) / len(words)
+    base = {"id": f"fake-{app.state.requests}", "object": "chat.completion.chunk", "model": payload.get("model", "deepseek-chat")}
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(pause)
+        delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+        chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    chunk = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    yield f"data: {json.dumps(chunk)}\n\n"
+    if (payload.get("stream_options") or {}).get("include_usage"):
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
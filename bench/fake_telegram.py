@@ -0,0 +1,144 @@
+"""Локальная заглушка Telegram Bot API для нагрузочных тестов.
+
+Бот настраивается на неё через TELEGRAM_BASE_URL=http://127.0.0.1:<port>/bot.
+Поддерживает getMe, getFile и скачивание файлов, sendMessage, editMessageText,
+answerCallbackQuery; все исходящие сообщения бота записываются в app.state.messages.
+"""
+import re
+import json
+import time
+import asyncio
+from collections import defaultdict
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import Response
+
+app = FastAPI()
+app.state.files = {}
+app.state.messages = defaultdict(list)
+app.state.waiters = defaultdict(list)
+app.state.calls = defaultdict(int)
+app.state.next_message_id = 1
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "HR Bot", "username": "fake_hr_bot"}
+
+
+def add_file(file_id, data):
+    """Регистрация файла, который бот сможет скачать через getFile."""
+    app.state.files[file_id] = data
+
+
+def reset():
+    app.state.messages.clear()
+    app.state.waiters.clear()
+    app.state.calls.clear()
+
+
+async def wait_for_messages(chat_id, count, timeout=120.0):
+    """Ожидание, пока бот отправит в чат count сообщений (считая с начала); время получения последнего."""
+    messages = app.state.messages[chat_id]
+    deadline = time.monotonic() + timeout
+    while len(messages) < count:
+        event = asyncio.Event()
+        app.state.waiters[chat_id].append(event)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError(f"chat {chat_id}: got {len(messages)} of {count} messages")
+        try:
+            await asyncio.wait_for(event.wait(), remaining)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"chat {chat_id}: got {len(messages)} of {count} messages") from None
+    return messages[count - 1]["received"]
+
+
+async def wait_for_text(chat_id, pattern, start=0, timeout=120.0):
+    """Ожидание сообщения или правки с текстом под регулярное выражение pattern (начиная с записи start).
+
+    Возвращает (индекс записи, время получения).
+    """
+    messages = app.state.messages[chat_id]
+    deadline = time.monotonic() + timeout
+    checked = start
+    while True:
+        for index in range(checked, len(messages)):
+            if re.search(pattern, messages[index]["text"]):
+                return index, messages[index]["received"]
+        checked = len(messages)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError(f"chat {chat_id}: no message matching {pattern!r}")
+        event = asyncio.Event()
+        app.state.waiters[chat_id].append(event)
+        try:
+            await asyncio.wait_for(event.wait(), remaining)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"chat {chat_id}: no message matching {pattern!r}") from None
+
+
+def _record(chat_id, kind, text):
+    app.state.messages[chat_id].append({"kind": kind, "text": text, "received": time.perf_counter()})
+    for event in app.state.waiters.pop(chat_id, []):
+        event.set()
+
+
+async def _params(request):
+    """Параметры вызова: PTB шлёт form-urlencoded, где непростые значения закодированы в JSON."""
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return json.loads(body or b"{}")
+    params = dict(parse_qsl(body.decode()))
+    params.update(request.query_params)
+    return params
+
+
+def _message(chat_id, text, message_id=None):
+    if message_id is None:
+        message_id = app.state.next_message_id
+        app.state.next_message_id += 1
+    return {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": BOT_USER,
+        "text": text,
+    }
+
+
+@app.api_route("/bot{token}/{method}", methods=["GET", "POST"])
+async def bot_api(token: str, method: str, request: Request):
+    params = await _params(request)
+    app.state.calls[method] += 1
+    if method == "getMe":
+        result = BOT_USER
+    elif method == "getFile":
+        file_id = params["file_id"]
+        if file_id not in app.state.files:
+            return {"ok": False, "error_code": 400, "description": "Bad Request: invalid file_id"}
+        result = {
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "file_size": len(app.state.files[file_id]),
+            "file_path": f"documents/{file_id}",
+        }
+    elif method == "sendMessage":
+        chat_id = int(params["chat_id"])
+        _record(chat_id, "send", params.get("text", ""))
+        result = _message(chat_id, params.get("text", ""))
+    elif method == "editMessageText":
+        chat_id = int(params["chat_id"])
+        _record(chat_id, "edit", params.get("text", ""))
+        result = _message(chat_id, params.get("text", ""), int(params["message_id"]))
+    elif method in ("answerCallbackQuery", "setWebhook", "deleteWebhook", "setMyCommands"):
+        result = True
+    else:
+        return {"ok": False, "error_code": 404, "description": f"Not Found: method {method} is not faked"}
+    return {"ok": True, "result": result}
+
+
+@app.get("/file/bot{token}/documents/{file_id}")
+async def download(token: str, file_id: str):
+    data = app.state.files.get(file_id)
+    if data is None:
+        raise HTTPException(status_code=404)
+    return Response(data, media_type="application/octet-stream")
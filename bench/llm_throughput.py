@@ -0,0 +1,73 @@
+"""Пропускная способность DeepSeekClient против локальной заглушки.
+
+Пример: python -m bench.llm_throughput --latency 0.5 --concurrency 1 4 16 --requests 32
+"""
+import time
+import asyncio
+import argparse
+
+import uvicorn
+
+from bench import fake_deepseek
+from llm import DeepSeekClient, TokenBucket
+
+
+async def start_server(app, port):
+    """Запуск uvicorn в текущем event loop; возвращает сервер и его задачу."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def run(client, users, total):
+    """total запросов от users одновременных пользователей; возвращает запросы в секунду."""
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def user():
+        while not queue.empty():
+            i = queue.get_nowait()
+            await client.analyze(f"Резюме кандидата №{i}: Python, SQL, asyncio", "Должность: Программист")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    return total / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0, help="лимит запросов/с (0 — без лимита)")
+    args = parser.parse_args()
+
+    fake_deepseek.app.state.latency = args.latency
+    fake_deepseek.app.state.error_rate = args.error_rate
+    server, task = await start_server(fake_deepseek.app, args.port)
+    try:
+        for users in args.concurrency:
+            client = DeepSeekClient(
+                "fake-key",
+                base_url=f"http://127.0.0.1:{args.port}",
+                max_concurrency=args.max_in_flight,
+                rate_limiter=TokenBucket(args.rate, args.rate or None),
+            )
+            try:
+                rps = await run(client, users, args.requests)
+            finally:
+                await client.close()
+            print(f"users={users:>4}  throughput={rps:8.2f} req/s  retries={client.retries}  errors={client.errors}")
+    finally:
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
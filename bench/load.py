@@ -0,0 +1,275 @@
+"""Нагрузочный тест api/webhook.py → bot.py с локальными заглушками Telegram, DeepSeek и PostgreSQL.
+
+Каждый виртуальный пользователь проходит диалог /add_vacancy → вакансия → N резюме → /finish
+и ждёт ответа бота на каждый шаг, как живой рекрутер. Отчёт: пропускная способность,
+p50/p95/p99 по обработчикам, число соединений с БД.
+
+Пример:
+    python -m bench.load --users 20 --resumes 5 --llm-latency 1.0 --save baseline.json
+    python -m bench.load --users 20 --resumes 5 --llm-latency 1.0 --compare baseline.json
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import defaultdict
+
+import httpx
+
+from bench import fake_deepseek, fake_telegram
+from bench.llm_throughput import start_server
+from bench.local_postgres import ROOT, LocalPostgres, free_port
+
+HANDLERS = ["add_vacancy", "save_vacancy", "handle_resume", "finish"]
+FIRST_CHAT_ID = 10000
+SKILLS = ["Python", "Django", "PostgreSQL", "asyncio", "Docker", "Kubernetes", "Java", "1С", "Excel", "SQL"]
+
+
+def make_pdf(index, pages=2):
+    """Синтетическое резюме в PDF."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for page in range(pages):
+        for line in range(40):
+            skill = SKILLS[(index + line + page) % len(SKILLS)]
+            pdf.drawString(40, 800 - line * 19, f"Candidate {index}: {line + 1} years of {skill} experience, page {page + 1}")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class Updates:
+    """Синтетические апдейты Telegram с уникальными update_id."""
+
+    def __init__(self):
+        self.update_id = 0
+        self.message_id = 0
+
+    def _message(self, chat_id, **fields):
+        self.update_id += 1
+        self.message_id += 1
+        return {
+            "update_id": self.update_id,
+            "message": {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": f"HR {chat_id}"},
+                **fields,
+            },
+        }
+
+    def command(self, chat_id, command):
+        return self._message(chat_id, text=command, entities=[{"type": "bot_command", "offset": 0, "length": len(command)}])
+
+    def text(self, chat_id, text):
+        return self._message(chat_id, text=text)
+
+    def document(self, chat_id, file_id, file_name):
+        return self._message(chat_id, document={
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "file_name": file_name,
+            "mime_type": "application/pdf",
+        })
+
+
+def percentile(values, q):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def start_bot(env, port):
+    """Бот (uvicorn api.webhook:app) в отдельном процессе, как в продакшене.
+
+    Ждём асинхронно: на старте бот обращается к заглушке Telegram в этом же event loop.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.webhook:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env}
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("bot process exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("bot did not start within 30s")
+
+
+async def user_session(client, updates, chat_id, resumes, latencies, errors):
+    """Один рекрутер: вакансия, resumes резюме и /finish; латентность шага — до последнего ответа бота."""
+    expected = 0
+
+    async def step(handler, update, replies):
+        nonlocal expected
+        started = time.perf_counter()
+        response = await client.post("/webhook", json=update)
+        if response.status_code != 200:
+            errors[handler] += 1
+            return
+        expected += replies
+        try:
+            finished = await fake_telegram.wait_for_messages(chat_id, expected)
+        except asyncio.TimeoutError:
+            errors[handler] += 1
+            expected = len(fake_telegram.app.state.messages[chat_id])
+            return
+        latencies[handler].append(finished - started)
+
+    await step("add_vacancy", updates.command(chat_id, "/add_vacancy"), 1)
+    await step("save_vacancy", updates.text(chat_id, "Программист, Python Django PostgreSQL asyncio, 150к"), 1)
+    for i in range(resumes):
+        file_id = f"resume-{chat_id}-{i}"
+        await step("handle_resume", updates.document(chat_id, file_id, f"{file_id}.pdf"), 1)
+    await step("finish", updates.command(chat_id, "/finish"), 1 + min(3, resumes) if resumes else 2)
+
+
+async def sample_connections(pg, samples, stop):
+    conn = await pg.connect()
+    try:
+        while not stop.is_set():
+            samples.append(await pg.connection_count(conn))
+            try:
+                await asyncio.wait_for(stop.wait(), 0.25)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await conn.close()
+
+
+async def run(args):
+    fake_deepseek.app.state.latency = args.llm_latency
+    fake_deepseek.app.state.error_rate = args.llm_error_rate
+    telegram_port, deepseek_port, bot_port = free_port(), free_port(), free_port()
+    telegram_server, telegram_task = await start_server(fake_telegram.app, telegram_port)
+    deepseek_server, deepseek_task = await start_server(fake_deepseek.app, deepseek_port)
+
+    chat_ids = [FIRST_CHAT_ID + i for i in range(args.users)]
+    for chat_id in chat_ids:
+        for i in range(args.resumes):
+            # Разные размеры и содержимое, чтобы не упираться в кэш анализа
+            fake_telegram.add_file(f"resume-{chat_id}-{i}", make_pdf(chat_id * 31 + i, pages=1 + i % args.pages))
+
+    async with LocalPostgres() as pg:
+        await pg.seed_users(chat_ids)
+        env = {
+            **pg.env,
+            "TELEGRAM_TOKEN": "123456:BENCH",
+            "TELEGRAM_BASE_URL": f"http://127.0.0.1:{telegram_port}/bot",
+            "DEEPSEEK_API_KEY": "bench",
+            "DEEPSEEK_BASE_URL": f"http://127.0.0.1:{deepseek_port}",
+            "DEEPSEEK_RATE_LIMIT": str(args.llm_rate),
+            "WEBHOOK_MODE": args.mode,
+        }
+        bot = await start_bot(env, bot_port)
+        samples, stop = [], asyncio.Event()
+        sampler = asyncio.create_task(sample_connections(pg, samples, stop))
+        latencies, errors = defaultdict(list), defaultdict(int)
+        updates = Updates()
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{bot_port}", timeout=300) as client:
+                started = time.perf_counter()
+                await asyncio.gather(*(
+                    user_session(client, updates, chat_id, args.resumes, latencies, errors) for chat_id in chat_ids
+                ))
+                elapsed = time.perf_counter() - started
+                bot_stats = (await client.get("/stats")).json()
+        finally:
+            stop.set()
+            await sampler
+            bot.terminate()
+            bot.wait(10)
+            for server, task in ((telegram_server, telegram_task), (deepseek_server, deepseek_task)):
+                server.should_exit = True
+                await task
+
+    resumes = len(latencies["handle_resume"])
+    return {
+        "config": vars(args),
+        "elapsed_s": round(elapsed, 2),
+        "resumes_per_min": round(resumes / elapsed * 60, 1),
+        "updates_per_s": round(sum(len(v) for v in latencies.values()) / elapsed, 2),
+        "handlers": {
+            name: {
+                "count": len(latencies[name]),
+                "errors": errors[name],
+                "p50_ms": round(percentile(latencies[name], 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies[name], 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies[name], 99) * 1000, 1),
+            }
+            for name in HANDLERS
+        },
+        "db_connections": {"max": max(samples, default=0), "avg": round(sum(samples) / len(samples), 1) if samples else 0},
+        "llm_requests": fake_deepseek.app.state.requests,
+        "telegram_calls": dict(fake_telegram.app.state.calls),
+        "bot_stats": bot_stats,
+    }
+
+
+def report(result, baseline=None):
+    def delta(key, value, lower_is_better=True):
+        if not baseline:
+            return ""
+        old = key(baseline)
+        if not old:
+            return ""
+        change = (value - old) / old * 100
+        better = change < 0 if lower_is_better else change > 0
+        return f"  ({change:+.0f}% {'✓' if better else '✗'})"
+
+    print(f"elapsed: {result['elapsed_s']} s")
+    print(f"throughput: {result['resumes_per_min']} resumes/min{delta(lambda r: r['resumes_per_min'], result['resumes_per_min'], False)}, "
+          f"{result['updates_per_s']} updates/s")
+    print(f"{'handler':<14}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, h in result["handlers"].items():
+        line = f"{name:<14}{h['count']:>7}{h['errors']:>8}{h['p50_ms']:>10}{h['p95_ms']:>10}{h['p99_ms']:>10}"
+        print(line + delta(lambda r, n=name: r["handlers"][n]["p95_ms"], h["p95_ms"]))
+    db = result["db_connections"]
+    print(f"db connections: max {db['max']}, avg {db['avg']}{delta(lambda r: r['db_connections']['max'], db['max'])}")
+    print(f"llm requests: {result['llm_requests']}, telegram calls: {result['telegram_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="одновременных рекрутеров")
+    parser.add_argument("--resumes", type=int, default=5, help="резюме на одного рекрутера")
+    parser.add_argument("--pages", type=int, default=3, help="максимум страниц в синтетическом резюме")
+    parser.add_argument("--mode", choices=["inline", "queue"], default="inline", help="WEBHOOK_MODE бота")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="задержка заглушки DeepSeek, с")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="доля ответов 429 от заглушки")
+    parser.add_argument("--llm-rate", type=float, default=0, help="DEEPSEEK_RATE_LIMIT бота (0 — без лимита)")
+    parser.add_argument("--save", help="сохранить результат в JSON (базовая линия)")
+    parser.add_argument("--compare", help="сравнить с ранее сохранённым JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report(result, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
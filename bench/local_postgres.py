@@ -0,0 +1,147 @@
+"""Одноразовый локальный PostgreSQL для бенчмарков, схема из schema.sql.
+
+Если задан BENCH_DB_HOST, используется уже запущенный сервер (BENCH_DB_PORT/USER/PASSWORD):
+на нём создаётся отдельная временная база, которая удаляется по завершении. Явно заданная
+BENCH_DB_NAME используется как есть (её таблицы пересоздаются), поэтому базы postgres и DB_NAME
+бота запрещены. Без BENCH_DB_HOST initdb + pg_ctl поднимают временный кластер в tmp-каталоге.
+"""
+import os
+import glob
+import shutil
+import secrets
+import socket
+import tempfile
+import subprocess
+
+import asyncpg
+from dotenv import dotenv_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = os.path.join(ROOT, "schema.sql")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _pg_bin(name):
+    """Путь к утилите PostgreSQL: из PATH или из /usr/lib/postgresql/<версия>/bin."""
+    path = shutil.which(name)
+    if path:
+        return path
+    candidates = sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{name}"))
+    if not candidates:
+        raise RuntimeError(f"{name} not found: install PostgreSQL or set BENCH_DB_HOST")
+    return candidates[-1]
+
+
+class LocalPostgres:
+    """Временная база: async with LocalPostgres() as pg: pg.env -> переменные DB_* для бота."""
+
+    def __init__(self, dbname="hr_bot_bench"):
+        self.dbname = dbname
+        self.datadir = None
+        self.temporary = False
+        self.env = {}
+
+    async def __aenter__(self):
+        if os.getenv("BENCH_DB_HOST"):
+            dbname = os.getenv("BENCH_DB_NAME")
+            if dbname in self._protected_databases():
+                raise RuntimeError(f"BENCH_DB_NAME={dbname} looks like a real database: its tables would be dropped")
+            self.env = {
+                "DB_HOST": os.getenv("BENCH_DB_HOST"),
+                "DB_PORT": os.getenv("BENCH_DB_PORT", "5432"),
+                "DB_USER": os.getenv("BENCH_DB_USER", "postgres"),
+                "DB_PASSWORD": os.getenv("BENCH_DB_PASSWORD", ""),
+                "DB_NAME": dbname or f"{self.dbname}_{secrets.token_hex(4)}",
+            }
+            if dbname:
+                await self._reset_schema()
+            else:
+                await self._create_database()
+                self.temporary = True
+        else:
+            self._start_cluster()
+            await self._create_database()
+        await self.execute_file(SCHEMA)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.temporary:
+            conn = await self.connect("postgres")
+            try:
+                await conn.execute(f'DROP DATABASE IF EXISTS "{self.env["DB_NAME"]}" WITH (FORCE)')
+            finally:
+                await conn.close()
+        if self.datadir:
+            subprocess.run([_pg_bin("pg_ctl"), "-D", self.datadir, "-m", "immediate", "stop"],
+                           capture_output=True)
+            shutil.rmtree(self.datadir, ignore_errors=True)
+
+    @staticmethod
+    def _protected_databases():
+        """Базы, которые нельзя очищать: postgres и DB_NAME бота из окружения или .env."""
+        names = {"postgres", os.getenv("DB_NAME")}
+        names.add(dotenv_values(os.path.join(ROOT, ".env")).get("DB_NAME"))
+        names.discard(None)
+        return names
+
+    def _start_cluster(self):
+        self.datadir = tempfile.mkdtemp(prefix="hr-bot-pg-")
+        port = free_port()
+        user = "postgres"
+        subprocess.run([_pg_bin("initdb"), "-D", self.datadir, "-U", user, "-A", "trust", "--no-sync"],
+                       check=True, capture_output=True)
+        options = f"-p {port} -k {self.datadir} -c listen_addresses=127.0.0.1 -c fsync=off -c max_connections=200"
+        subprocess.run([_pg_bin("pg_ctl"), "-D", self.datadir, "-o", options, "-w", "-l",
+                        os.path.join(self.datadir, "server.log"), "start"], check=True, capture_output=True)
+        self.env = {"DB_HOST": "127.0.0.1", "DB_PORT": str(port), "DB_USER": user, "DB_PASSWORD": "", "DB_NAME": self.dbname}
+
+    async def connect(self, database=None):
+        return await asyncpg.connect(
+            host=self.env["DB_HOST"], port=int(self.env["DB_PORT"]), user=self.env["DB_USER"],
+            password=self.env["DB_PASSWORD"] or None, database=database or self.env["DB_NAME"],
+        )
+
+    async def _create_database(self):
+        conn = await self.connect("postgres")
+        try:
+            await conn.execute(f'CREATE DATABASE "{self.env["DB_NAME"]}"')
+        finally:
+            await conn.close()
+
+    async def _reset_schema(self):
+        conn = await self.connect()
+        try:
+            await conn.execute("DROP TABLE IF EXISTS resumes, vacancies, users CASCADE")
+        finally:
+            await conn.close()
+
+    async def execute_file(self, path):
+        with open(path, encoding="utf-8") as f:
+            script = f.read()
+        conn = await self.connect()
+        try:
+            await conn.execute(script)
+        finally:
+            await conn.close()
+
+    async def seed_users(self, telegram_ids, role="HR"):
+        conn = await self.connect()
+        try:
+            await conn.executemany(
+                "INSERT INTO users (telegram_id, role) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+                [(telegram_id, role) for telegram_id in telegram_ids]
+            )
+        finally:
+            await conn.close()
+
+    async def connection_count(self, conn):
+        """Число клиентских соединений к базе бенчмарка, не считая conn."""
+        return await conn.fetchval(
+            "SELECT count(*) FROM pg_stat_activity WHERE datname = $1 AND pid <> pg_backend_pid()",
+            self.env["DB_NAME"]
+        )
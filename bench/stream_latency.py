@@ -0,0 +1,111 @@
+"""Время до первой обратной связи по резюме: обычный ответ против потокового (DEEPSEEK_STREAM=1).
+
+Бот запускается дважды на одних и тех же заглушках Telegram, DeepSeek (SSE) и PostgreSQL.
+По каждому резюме измеряется: первое сообщение бота, появление оценки и итоговый ответ.
+
+Пример: python -m bench.stream_latency --users 5 --resumes 3 --llm-latency 8 --first-token 0.3
+"""
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from bench import fake_deepseek, fake_telegram
+from bench.llm_throughput import start_server
+from bench.load import Updates, make_pdf, percentile, start_bot
+from bench.local_postgres import LocalPostgres, free_port
+
+MODES = {"blocking": "0", "stream": "1"}
+FIRST_CHAT_ID = 20000
+MILESTONES = ["first_feedback", "score", "done"]
+
+
+async def user_session(client, updates, chat_id, resumes, timings):
+    """Вакансия и resumes резюме; для каждого резюме — время до каждой из MILESTONES."""
+    async def post(update):
+        start = len(fake_telegram.app.state.messages[chat_id])
+        started = time.perf_counter()
+        response = await client.post("/webhook", json=update)
+        response.raise_for_status()
+        return start, started
+
+    start, _ = await post(updates.command(chat_id, "/add_vacancy"))
+    await fake_telegram.wait_for_text(chat_id, "", start)
+    start, _ = await post(updates.text(chat_id, "Программист, Python Django PostgreSQL asyncio, 150к"))
+    await fake_telegram.wait_for_text(chat_id, "", start)
+    for i in range(resumes):
+        start, started = await post(updates.document(chat_id, f"resume-{chat_id}-{i}", f"resume-{chat_id}-{i}.pdf"))
+        for milestone, pattern in zip(MILESTONES, ("", r"Оценка: \d+\.\d", "Резюме обработано")):
+            _, received = await fake_telegram.wait_for_text(chat_id, pattern, start)
+            timings[milestone].append(received - started)
+
+
+async def run_mode(mode, args, env, chat_ids):
+    bot_port = free_port()
+    bot = await start_bot({**env, "DEEPSEEK_STREAM": MODES[mode]}, bot_port)
+    timings = {milestone: [] for milestone in MILESTONES}
+    edits_before = fake_telegram.app.state.calls["editMessageText"]
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{bot_port}", timeout=300) as client:
+            updates = Updates()
+            await asyncio.gather(*(user_session(client, updates, chat_id, args.resumes, timings) for chat_id in chat_ids))
+    finally:
+        bot.terminate()
+        bot.wait(10)
+    return timings, fake_telegram.app.state.calls["editMessageText"] - edits_before
+
+
+async def run(args):
+    fake_deepseek.app.state.latency = args.llm_latency
+    fake_deepseek.app.state.first_token = args.first_token
+    telegram_port, deepseek_port = free_port(), free_port()
+    telegram_server, telegram_task = await start_server(fake_telegram.app, telegram_port)
+    deepseek_server, deepseek_task = await start_server(fake_deepseek.app, deepseek_port)
+    results = {}
+    try:
+        async with LocalPostgres() as pg:
+            for offset, mode in enumerate(MODES):
+                # У каждого режима свои чаты и файлы, чтобы не попасть в кэш анализа
+                chat_ids = [FIRST_CHAT_ID + offset * 1000 + i for i in range(args.users)]
+                for chat_id in chat_ids:
+                    for i in range(args.resumes):
+                        fake_telegram.add_file(f"resume-{chat_id}-{i}", make_pdf(chat_id * 31 + i, pages=1))
+                await pg.seed_users(chat_ids)
+                env = {
+                    **pg.env,
+                    "TELEGRAM_TOKEN": "123456:BENCH",
+                    "TELEGRAM_BASE_URL": f"http://127.0.0.1:{telegram_port}/bot",
+                    "DEEPSEEK_API_KEY": "bench",
+                    "DEEPSEEK_BASE_URL": f"http://127.0.0.1:{deepseek_port}",
+                    "DEEPSEEK_RATE_LIMIT": "0",
+                    "STREAM_EDIT_INTERVAL": str(args.edit_interval),
+                }
+                results[mode] = await run_mode(mode, args, env, chat_ids)
+    finally:
+        for server, task in ((telegram_server, telegram_task), (deepseek_server, deepseek_task)):
+            server.should_exit = True
+            await task
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=3, help="одновременных рекрутеров")
+    parser.add_argument("--resumes", type=int, default=3, help="резюме на одного рекрутера")
+    parser.add_argument("--llm-latency", type=float, default=5.0, help="полное время ответа заглушки DeepSeek, с")
+    parser.add_argument("--first-token", type=float, default=0.3, help="время до первого фрагмента SSE, с")
+    parser.add_argument("--edit-interval", type=float, default=1.0, help="STREAM_EDIT_INTERVAL бота, с")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'mode':<10}{'milestone':<16}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode, (timings, edits) in results.items():
+        for milestone in MILESTONES:
+            values = timings[milestone]
+            print(f"{mode:<10}{milestone:<16}{percentile(values, 50) * 1000:>10.0f}{percentile(values, 95) * 1000:>10.0f}")
+        print(f"{mode:<10}{'edits':<16}{edits:>10}")
+
+
+if __name__ == "__main__":
+    main()
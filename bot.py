@@ -1,15 +1,19 @@
 import os
-from PyPDF2 import PdfReader
-from docx import Document
+import asyncio
 from dotenv import load_dotenv
-from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ConversationHandler, ContextTypes
-import psycopg2
-import requests
-import re
-import time
+from telegram import Update, Document as TelegramDocument, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import (
+    Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ConversationHandler, ContextTypes
+)
 import logging
-from tempfile import NamedTemporaryFile
+from db import Database
+from cache import TTLCache, MISSING
+from llm import DeepSeekClient, PROMPT_RESUME_CHARS
+from analysis_cache import AnalysisCache
+from bulk import ZIP_MIME_TYPES, MediaGroupCollector, kind_from_name, read_zip_documents, process_batch
+from progress import ProgressMessage
+import extraction
+import metrics
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -22,60 +26,153 @@ if not TELEGRAM_TOKEN:
     logger.error("TELEGRAM_TOKEN not found in .env!")
     raise ValueError("TELEGRAM_TOKEN not found in .env!")
 
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DB_CONFIG = {
-    "dbname": os.getenv("DB_NAME", "postgres"),
-    "user": os.getenv("DB_USER", "postgres"),
-    "password": os.getenv("DB_PASSWORD", ""),
-    "host": os.getenv("DB_HOST", ""),
-    "port": os.getenv("DB_PORT", "5432")
-}
 
 # Глобальная переменная для Telegram Application
 _application = None
+_init_lock = asyncio.Lock()
+# Фоновые задачи (альбомы в режиме очереди): ссылки держим, чтобы их не собрал GC
+_background_tasks = set()
 
 # Состояния для ConversationHandler
 VACANCY, RESUME, PROCESSING = range(3)
 
+# Сколько символов анализа показывать в сообщении потокового режима (лимит Telegram — 4096)
+STREAM_PREVIEW_CHARS = 3500
+
 def get_application():
     """Ленивая инициализация Telegram Application."""
     global _application
     if _application is None:
         logger.info("Initializing Telegram Application")
-        _application = Application.builder().token(TELEGRAM_TOKEN).build()
+        builder = Application.builder().token(TELEGRAM_TOKEN)
+        base_url = os.getenv("TELEGRAM_BASE_URL")
+        if base_url:
+            # Собственный Bot API сервер или локальная заглушка (bench/fake_telegram.py), вида http://host/bot
+            base_file_url = os.getenv("TELEGRAM_BASE_FILE_URL") or base_url.rsplit("/bot", 1)[0] + "/file/bot"
+            builder = builder.base_url(base_url).base_file_url(base_file_url)
+        _application = builder.build()
+        # Пул соединений создаётся один раз на Application и подключается лениво
+        _application.bot_data["db"] = Database.from_env()
+        _application.bot_data["role_cache"] = TTLCache(
+            maxsize=int(os.getenv("ROLE_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("ROLE_CACHE_TTL", "300"))
+        )
+        _application.bot_data["llm"] = DeepSeekClient.from_env()
+        _application.bot_data["analysis_cache"] = AnalysisCache(
+            _application.bot_data["db"],
+            memory_size=int(os.getenv("ANALYSIS_CACHE_SIZE", "1024"))
+        )
+        _application.bot_data["media_groups"] = MediaGroupCollector(
+            quiet_period=float(os.getenv("BULK_MEDIA_GROUP_WAIT", "1.5"))
+        )
+        register_metrics(_application)
         setup_handlers(_application)
     return _application
 
-def get_db_connection():
-    """Подключение к PostgreSQL."""
+def register_metrics(application: Application):
+    """Экспорт счётчиков пула БД, кэшей, DeepSeek и разбора файлов в /metrics."""
+    metrics.configure(os.getenv("METRICS_ENABLED", "1") == "1")
+    if not metrics.is_enabled():
+        return
+    bot_data = application.bot_data
+    metrics.register_stats("db_pool", bot_data["db"].pool_stats, counters=("acquired", "timeouts"))
+    metrics.register_stats("role_cache", bot_data["role_cache"].stats, counters=("hits", "misses"))
+    metrics.register_stats(
+        "llm", bot_data["llm"].stats,
+        counters=("requests", "retries", "errors", "prompt_tokens", "completion_tokens")
+    )
+    metrics.register_stats(
+        "analysis_cache", bot_data["analysis_cache"].stats,
+        counters=("memory_hits", "db_hits", "misses", "coalesced", "llm_calls_saved")
+    )
+    metrics.register_stats("extraction", extraction.stats.as_dict, counters=("files", "timeouts", "errors"))
+
+async def init_application():
+    """Application, готовое к обработке апдейтов; инициализируется один раз на процесс."""
+    application = get_application()
+    async with _init_lock:
+        await application.initialize()  # повторный вызов ничего не делает
+    return application
+
+async def shutdown_application():
+    """Освобождение ресурсов Application: пул БД, HTTP-клиент DeepSeek, процессы разбора."""
+    if _application is None:
+        return
+    await _application.shutdown()
+    await _application.bot_data["db"].close()
+    await _application.bot_data["llm"].close()
+    extraction.shutdown()
+
+def run_in_background(coro, name):
+    """Задача вне обработки апдейта; ошибки логируются, ссылка хранится до завершения."""
+    def on_done(task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background {name} failed: {task.exception()}")
+
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(on_done)
+    return task
+
+def get_db(context: ContextTypes.DEFAULT_TYPE) -> Database:
+    """Общий пул соединений текущего Application."""
+    return context.bot_data["db"]
+
+async def _subscribe_role_updates(context: ContextTypes.DEFAULT_TYPE):
+    """Инвалидация кэша ролей по NOTIFY от других инстансов (ROLE_CACHE_NOTIFY=1).
+
+    Если соединение LISTEN оборвалось, подписка восстанавливается на следующем промахе кэша.
+    """
+    if os.getenv("ROLE_CACHE_NOTIFY", "0") != "1":
+        return
+    db = get_db(context)
+    if db.is_listening() or context.bot_data.get("role_listener_pending"):
+        return
+    context.bot_data["role_listener_pending"] = True
+    resubscribe = context.bot_data.get("role_listener", False)
+    cache = context.bot_data["role_cache"]
+
+    def on_notify(connection, pid, channel, payload):
+        logger.debug(f"Role of user {payload} changed, invalidating cache")
+        cache.invalidate(int(payload))
+
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        logger.info("✅ Database connection established!")
-        return conn
+        await db.listen(db.users.CHANNEL, on_notify)
+        context.bot_data["role_listener"] = True
+        if resubscribe:
+            # Пока соединения не было, уведомления терялись — закэшированным ролям верить нельзя
+            cache.clear()
+            logger.warning("Role notifications resubscribed, role cache cleared")
     except Exception as e:
-        logger.error(f"❌ Database connection failed: {e}")
-        raise
+        logger.error(f"❌ Role notifications unavailable: {e}")
+    finally:
+        context.bot_data["role_listener_pending"] = False
 
-def is_authorized_user(user_id):
+async def get_user_role(context: ContextTypes.DEFAULT_TYPE, user_id):
+    """Роль пользователя (HR, Employer, Admin) или None, если доступа нет."""
+    cache = context.bot_data["role_cache"]
+    role = cache.get(user_id, MISSING)
+    if role is MISSING:
+        try:
+            await _subscribe_role_updates(context)
+            role = await get_db(context).users.get_role(user_id)
+        except Exception as e:
+            logger.error(f"❌ Authorization check failed: {e}")
+            return None
+        logger.debug(f"Checking user {user_id}, result: {role}")
+        cache.set(user_id, role)
+    return role if role in ["HR", "Employer", "Admin"] else None
+
+async def is_authorized_user(context: ContextTypes.DEFAULT_TYPE, user_id):
     """Проверка авторизации пользователя."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT role FROM users WHERE telegram_id = %s", (user_id,))
-        result = cursor.fetchone()
-        logger.debug(f"Checking user {user_id}, result: {result}")
-        cursor.close()
-        conn.close()
-        return result and result[0] in ["HR", "Employer", "Admin"]
-    except Exception as e:
-        logger.error(f"❌ Authorization check failed: {e}")
-        return False
+    return await get_user_role(context, user_id) is not None
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка команды /start."""
     user_id = update.effective_user.id
     logger.info(f"Received /start from user {user_id}")
-    if not is_authorized_user(user_id):
+    if not await is_authorized_user(context, user_id):
         await update.message.reply_text("⛔ Ой-ой! Доступ запрещён! Обратитесь к администратору для добавления вас в команду! 📞")
         return
     await update.message.reply_text(
@@ -86,41 +183,30 @@ async def add_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Добавление нового пользователя."""
     user_id = update.effective_user.id
     logger.info(f"Received /add_user from user {user_id}")
-    if not is_authorized_user(user_id):
+    role = await get_user_role(context, user_id)
+    if not role:
         await update.message.reply_text("⛔ Только админ может добавлять новых героев! 😄")
         return
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT role FROM users WHERE telegram_id = %s", (user_id,))
-    role = cursor.fetchone()
-    if role and role[0] != 'Admin':
+    if role != 'Admin':
         await update.message.reply_text("⛔ Только админ может добавлять пользователей! 👮‍♂️")
-        cursor.close()
-        conn.close()
         return
     args = context.args
     if len(args) != 2:
         await update.message.reply_text("⚠️ Используй: /add_user <telegram_id> <role> (HR, Employer, Admin)! 📝")
-        cursor.close()
-        conn.close()
         return
     telegram_id, role = int(args[0]), args[1].capitalize()
     if role not in ["HR", "Employer", "Admin"]:
         await update.message.reply_text("⚠️ Роль должна быть HR, Employer или Admin! 😄")
-        cursor.close()
-        conn.close()
         return
-    cursor.execute("INSERT INTO users (telegram_id, role) VALUES (%s, %s) ON CONFLICT DO NOTHING", (telegram_id, role))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    await get_db(context).users.add(telegram_id, role)
+    context.bot_data["role_cache"].invalidate(telegram_id)
     await update.message.reply_text(f"🎉 Новый герой {telegram_id} с ролью {role} добавлен в команду! 🚀")
 
 async def add_vacancy(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Добавление вакансии."""
     user_id = update.effective_user.id
     logger.info(f"Received /add_vacancy from user {user_id}")
-    if not is_authorized_user(user_id):
+    if not await is_authorized_user(context, user_id):
         await update.message.reply_text("⛔ Доступ только для HR и работодателей! 😄")
         return ConversationHandler.END
     await update.message.reply_text(
@@ -132,7 +218,7 @@ async def save_vacancy(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Сохранение вакансии."""
     user_id = update.effective_user.id
     logger.info(f"Saving vacancy for user {user_id}")
-    if not is_authorized_user(user_id):
+    if not await is_authorized_user(context, user_id):
         await update.message.reply_text("⛔ Доступ запрещён! 😞")
         return ConversationHandler.END
     vacancy_data = update.message.text
@@ -144,114 +230,279 @@ async def save_vacancy(update: Update, context: ContextTypes.DEFAULT_TYPE):
     requirements = parts[1].strip()
     salary = parts[2].strip() if len(parts) > 2 else "Не указана"
     vacancy_data = f"Должность: {position}, Требования: {requirements}, Зарплата: {salary}"
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO vacancies (user_id, vacancy_data) VALUES (%s, %s) RETURNING id",
-        (user_id, vacancy_data)
-    )
-    vacancy_id = cursor.fetchone()[0]
-    conn.commit()
-    cursor.close()
-    conn.close()
+    vacancy_id = await get_db(context).vacancies.create(user_id, vacancy_data)
     context.user_data["vacancy_id"] = vacancy_id
     context.user_data["vacancy_data"] = vacancy_data
+    context.user_data["requirements"] = requirements
+    # Корпус BM25 строится лениво по требованиям — от прошлой вакансии его нужно сбросить
+    context.user_data.pop("corpus", None)
     await update.message.reply_text(f"🎉 Вакансия сохранена! Загрузи резюме (PDF/DOCX) и давай найдём звезду! 🌟")
     return RESUME
 
+def get_corpus(context: ContextTypes.DEFAULT_TYPE):
+    """BM25-корпус резюме текущей вакансии (создаётся при первом резюме)."""
+    if "corpus" not in context.user_data:
+        from prescreen import VacancyCorpus  # NumPy нужен только при обработке резюме
+        context.user_data["corpus"] = VacancyCorpus(context.user_data.get("requirements", ""))
+    return context.user_data["corpus"]
+
+def document_kind(document):
+    """Тип загруженного файла: pdf, docx или zip."""
+    name = (document.file_name or "").lower()
+    if document.mime_type == "application/pdf" or name.endswith(".pdf"):
+        return "pdf"
+    if document.mime_type in ZIP_MIME_TYPES or name.endswith(".zip"):
+        return "zip"
+    return "docx"
+
+async def download_document(document):
+    """Скачивание документа Telegram в память."""
+    file = await document.get_file()
+    return bytes(await file.download_as_bytearray())
+
+async def add_resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Загрузка следующих резюме для текущей вакансии."""
+    user_id = update.effective_user.id
+    logger.info(f"Received /add_resume from user {user_id}")
+    if not await is_authorized_user(context, user_id):
+        await update.message.reply_text("⛔ Доступ только для HR и работодателей! 😄")
+        return ConversationHandler.END
+    await update.message.reply_text(
+        "📎 Загружай резюме (PDF/DOCX)! Можно сразу несколько файлов альбомом или ZIP-архивом! 🚀"
+    )
+    return RESUME
+
 async def handle_resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка загруженного резюме."""
     user_id = update.effective_user.id
     logger.info(f"Handling resume for user {user_id}")
-    if not is_authorized_user(user_id):
+    if not await is_authorized_user(context, user_id):
         await update.message.reply_text("⛔ Только для своих! 😄")
         return ConversationHandler.END
     if not update.message.document:
         await update.message.reply_text("⚠️ Пожалуйста, загрузи файл PDF или DOCX! 😄")
         return RESUME
-    file = await update.message.document.get_file()
-    with NamedTemporaryFile(delete=False, suffix=".pdf" if update.message.document.mime_type == "application/pdf" else ".docx") as tmp_file:
-        await file.download_to_drive(tmp_file.name)
-        text = extract_text(tmp_file.name)
-    if not text:
-        await update.message.reply_text("⚠️ Не удалось извлечь текст из файла! Попробуй другой файл! 😄")
-        return RESUME
     vacancy_id = context.user_data.get("vacancy_id")
     if not vacancy_id:
         await update.message.reply_text("⚠️ Вакансия не найдена! Начни заново с /add_vacancy! 😄")
         return ConversationHandler.END
-    score, analysis = analyze_resume(text, context.user_data.get("vacancy_data", ""))
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO resumes (vacancy_id, user_id, resume_text, score, analysis) VALUES (%s, %s, %s, %s, %s)",
-        (vacancy_id, user_id, text, score, analysis)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
-    await update.message.reply_text(
-        f"🎉 Резюме обработано! Оценка: {score:.1f}, Анализ: {analysis[:100]}...\n"
-        "Хочешь загрузить ещё? (/add_resume) Или завершить? (/finish) 🚀"
-    )
-    return PROCESSING
-
-def extract_text(file_path):
-    """Извлечение текста из PDF или DOCX."""
-    try:
-        if file_path.endswith(".pdf"):
-            with open(file_path, "rb") as f:
-                pdf = PdfReader(f)
-                return " ".join(page.extract_text() or "" for page in pdf.pages)
-        elif file_path.endswith(".docx"):
-            doc = Document(file_path)
-            return " ".join(paragraph.text or "" for paragraph in doc.paragraphs)
-        return ""
-    except Exception as e:
-        logger.error(f"Error extracting text: {e}")
-        return ""
-    finally:
+    document = update.message.document
+    if update.message.media_group_id:
+        group_id = update.message.media_group_id
+        if not context.bot_data["media_groups"].add(group_id, document):
+            # Группу целиком обработает апдейт с её первым документом; состояние диалога не меняем
+            return None
+        if context.bot_data.get("media_groups_in_background"):
+            # Апдейты чата обрабатываются по очереди одним воркером: если ждать группу здесь,
+            # остальные документы альбома не дойдут до сборщика
+            run_in_background(handle_media_group(update, context, group_id), f"media group {group_id}")
+            return PROCESSING
+        return await handle_media_group(update, context, group_id)
+    kind = document_kind(document)
+    if kind == "zip":
         try:
-            os.unlink(file_path)
+            files = read_zip_documents(
+                await download_document(document),
+                max_files=int(os.getenv("BULK_MAX_FILES", "200")),
+                max_total_size=int(os.getenv("BULK_MAX_TOTAL_BYTES", str(100 * 1024 * 1024)))
+            )
         except Exception as e:
-            logger.error(f"Error deleting temp file: {e}")
+            logger.error(f"Error reading archive: {e}")
+            files = []
+        if not files:
+            await update.message.reply_text("⚠️ В архиве не нашлось PDF или DOCX! Попробуй другой архив! 😄")
+            return RESUME
+        return await handle_resume_batch(update, context, files)
+    progress = on_partial = None
+    if os.getenv("DEEPSEEK_STREAM", "0") == "1":
+        # Сразу отвечаем заглушкой и дописываем её по мере генерации ответа DeepSeek
+        progress = await ProgressMessage.send(
+            update.message, "⏳ Резюме получено, читаю файл... 📖",
+            interval=float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+        )
+
+        score_shown = False
+
+        async def show_progress(text, bypass_interval=False):
+            # Промежуточные правки — косметика: их сбой не должен обрывать поток ответа DeepSeek
+            try:
+                return await progress.update(text, bypass_interval=bypass_interval)
+            except Exception as e:
+                logger.error(f"Streaming progress edit failed: {e}")
+                return False
+
+        async def on_partial(partial, score):
+            nonlocal score_shown
+            # Оценку показываем сразу, как только она появилась; остальной текст — с троттлингом
+            first_score = score is not None and not score_shown
+            if await show_progress(format_partial_analysis(partial, score), bypass_interval=first_score):
+                score_shown = score_shown or score is not None
+
+    async def respond(text):
+        if progress is not None:
+            await progress.update(text, force=True)
+        else:
+            await update.message.reply_text(text)
+
+    # Для оценки хватает начала резюме; полный текст дочитается в фоне после ответа
+    with metrics.stage("handle_resume", "download"):
+        data = await download_document(document)
+    with metrics.stage("handle_resume", "extract_text"):
+        text, truncated = await extraction.extract(data, kind, limit=PROMPT_RESUME_CHARS)
+    if not text:
+        await respond("⚠️ Не удалось извлечь текст из файла! Попробуй другой файл! 😄")
+        return RESUME
+    if progress is not None:
+        await show_progress("🤖 AI читает резюме... 🔍")
+    with metrics.stage("handle_resume", "analyze_resume"):
+        score, analysis, (resume_hash, vacancy_hash) = await analyze_resume(
+            context, text, context.user_data.get("vacancy_data", ""), on_partial
+        )
+    with metrics.stage("handle_resume", "prescreen"):
+        local_score = float(get_corpus(context).add_and_score([text])[0])
+    db = get_db(context)
+    with metrics.stage("handle_resume", "db_insert"):
+        resume_id = await db.resumes.add(
+            vacancy_id, user_id, text, score, analysis, resume_hash, vacancy_hash, local_score
+        )
+    if truncated:
+        extraction.store_full_text_later(db, resume_id, data, kind)
+    with metrics.stage("handle_resume", "reply"):
+        if progress is not None:
+            # Анализ уже прочитан целиком по ходу генерации — оставляем его в сообщении
+            await respond(
+                f"🎉 Резюме обработано! Оценка: {score:.1f} ⭐\n\n{analysis[:STREAM_PREVIEW_CHARS]}\n\n"
+                "Хочешь загрузить ещё? (/add_resume) Или завершить? (/finish) 🚀"
+            )
+        else:
+            await respond(
+                f"🎉 Резюме обработано! Оценка: {score:.1f}, Анализ: {analysis[:100]}...\n"
+                "Хочешь загрузить ещё? (/add_resume) Или завершить? (/finish) 🚀"
+            )
+    return PROCESSING
+
+async def handle_media_group(update: Update, context: ContextTypes.DEFAULT_TYPE, group_id):
+    """Пакетная обработка альбома, когда в медиагруппу перестанут приходить документы."""
+    documents = await context.bot_data["media_groups"].collect(group_id)
+    return await handle_resume_batch(update, context, [(d.file_name or "resume", d) for d in documents])
+
+async def handle_resume_batch(update: Update, context: ContextTypes.DEFAULT_TYPE, files):
+    """Параллельная обработка пачки резюме: files — пары (имя, байты или документ Telegram)."""
+    user_id = update.effective_user.id
+    vacancy_id = context.user_data["vacancy_id"]
+    vacancy_data = context.user_data.get("vacancy_data", "")
+    logger.info(f"Bulk processing {len(files)} resumes for user {user_id}")
+    progress = await ProgressMessage.send(update.message, f"⏳ Принято резюме: {len(files)}. Начинаю обработку! 🚀")
+
+    concurrency = int(os.getenv("BULK_CONCURRENCY", "4"))
 
-def analyze_resume(resume_text, vacancy_data):
-    """Анализ резюме с помощью DeepSeek API."""
-    if not DEEPSEEK_API_KEY:
+    async def extract_file(item):
+        name, source = item
+        kind = kind_from_name(name) or (document_kind(source) if isinstance(source, TelegramDocument) else None)
+        if kind not in ("pdf", "docx"):
+            raise ValueError(f"unsupported file {name}")
+        data = await download_document(source) if isinstance(source, TelegramDocument) else source
+        text, truncated = await extraction.extract(data, kind, limit=PROMPT_RESUME_CHARS)
+        if not text:
+            raise ValueError(f"no text in {name}")
+        return text, ((data, kind) if truncated else None)
+
+    async def on_extracted(done, total):
+        await progress.update(f"⏳ Прочитано {done} из {total} резюме... 📖")
+
+    with metrics.stage("handle_resume_batch", "extract_text"):
+        results = await process_batch(files, extract_file, concurrency=concurrency, on_progress=on_extracted)
+    extracted = [result for _, result in results if not isinstance(result, Exception)]
+    failed = [name for (name, _), result in results if isinstance(result, Exception)]
+
+    # Локальный BM25-отбор: в DeepSeek уходят только лучшие резюме
+    with metrics.stage("handle_resume_batch", "prescreen"):
+        local_scores = get_corpus(context).add_and_score([text for text, _ in extracted])
+        top_k = int(os.getenv("PRESCREEN_TOP_K", "20"))
+        min_score = float(os.getenv("PRESCREEN_MIN_SCORE", "0"))
+        if len(extracted) > top_k > 0 or min_score > 0:
+            from prescreen import select_for_llm
+            selected = select_for_llm(local_scores, top_k, min_score)
+        else:
+            selected = set(range(len(extracted)))
+
+    async def score_file(index):
+        return await analyze_resume(context, extracted[index][0], vacancy_data)
+
+    async def on_scored(done, total):
+        await progress.update(f"🤖 AI оценил {done} из {total} лучших резюме... 🔍")
+
+    with metrics.stage("handle_resume_batch", "analyze_resume"):
+        analyses = dict(await process_batch(sorted(selected), score_file, concurrency=concurrency, on_progress=on_scored))
+    rows = []
+    for index, (text, _) in enumerate(extracted):
+        local_score = float(local_scores[index])
+        result = analyses.get(index)
+        if result is None or isinstance(result, Exception):
+            rows.append((text, None, f"⏭️ Не прошло локальный отбор (BM25: {local_score:.2f})", None, None, local_score))
+        else:
+            score, analysis, (resume_hash, vacancy_hash) = result
+            rows.append((text, score, analysis, resume_hash, vacancy_hash, local_score))
+    db = get_db(context)
+    with metrics.stage("handle_resume_batch", "db_insert"):
+        resume_ids = await db.resumes.add_many(vacancy_id, user_id, rows)
+    for resume_id, (_, pending) in zip(resume_ids, extracted):
+        if pending:
+            extraction.store_full_text_later(db, resume_id, *pending)
+    summary = f"🎉 Готово! Обработано резюме: {len(rows)} из {len(files)}."
+    scores = [row[1] for row in rows if row[1] is not None]
+    if scores:
+        summary += f" Лучшая оценка: {max(scores):.1f} ⭐"
+    if len(scores) < len(rows):
+        summary += f"\n🔎 AI оценил {len(scores)} лучших, остальные отсеяны локальным отбором."
+    if failed:
+        summary += f"\n⚠️ Не удалось обработать: {', '.join(failed[:10])}" + (" и др." if len(failed) > 10 else "")
+    summary += "\nХочешь загрузить ещё? (/add_resume) Или завершить? (/finish) 🚀"
+    await progress.update(summary, force=True)
+    return PROCESSING
+
+def format_partial_analysis(partial, score):
+    """Промежуточный текст сообщения, пока DeepSeek дописывает анализ."""
+    header = f"🤖 Оценка: {score:.1f} ⭐ AI дописывает анализ..." if score is not None else "🤖 AI анализирует резюме..."
+    return f"{header}\n\n{partial[:STREAM_PREVIEW_CHARS]} ▌"
+
+def format_score(score):
+    """Оценка для вывода; у резюме, отсеянных локальным отбором, её нет."""
+    return f"{score:.1f}" if score is not None else "—"
+
+async def analyze_resume(context: ContextTypes.DEFAULT_TYPE, resume_text, vacancy_data, on_partial=None):
+    """Анализ резюме с помощью DeepSeek API с кэшем по содержимому.
+
+    Возвращает (score, analysis, (resume_hash, vacancy_hash)); для ответов-заглушек (в том числе
+    ответа модели без оценки) хеши None, чтобы подставленная 5.0 не попала в кэш. С on_partial ответ читается потоком, и on_partial(текст, оценка)
+    вызывается на каждом фрагменте; при попадании в кэш фрагментов нет.
+    """
+    client = context.bot_data["llm"]
+    if not client.api_key:
         logger.error("DEEPSEEK_API_KEY not found!")
-        return 5.0, "Ошибка: API-ключ DeepSeek не настроен."
-    prompt = (
-        f"Анализируй резюме: {resume_text[:2000]}\n"
-        f"Вакансия: {vacancy_data}\n"
-        f"Оцени по шкале от 0 до 10 с одним десятичным знаком (например, 7.5) и дай краткий анализ (2-3 предложения) с позитивным настроением! 😄"
-    )
-    headers = {"Authorization": f"Bearer {DEEPSEEK_API_KEY}", "Content-Type": "application/json"}
+        metrics.FALLBACK_SCORES.inc(reason="no_api_key")
+        return 5.0, "Ошибка: API-ключ DeepSeek не настроен.", (None, None)
     try:
-        time.sleep(1)  # Ограничение скорости для API
-        response = requests.post(
-            "https://api.deepseek.com/chat/completions",
-            headers=headers,
-            json={"model": "deepseek-chat", "messages": [{"role": "user", "content": prompt}], "stream": False}
+        score, analysis, hashes = await context.bot_data["analysis_cache"].get_or_compute(
+            resume_text, vacancy_data,
+            (lambda: client.analyze_stream(resume_text, vacancy_data, on_partial)) if on_partial
+            else (lambda: client.analyze(resume_text, vacancy_data))
         )
-        response.raise_for_status()
-        result = response.json()["choices"][0]["message"]["content"]
-        score = extract_score(result)
-        return score, result
     except Exception as e:
         logger.error(f"DeepSeek API error: {e}")
-        return 5.0, f"Ошибка анализа: {str(e)}. Попробуем ещё раз? 😄"
-
-def extract_score(gpt_response):
-    """Извлечение оценки из ответа DeepSeek."""
-    match = re.search(r"\b\d+\.\d\b", gpt_response)
-    return float(match.group()) if match else 5.0
+        metrics.FALLBACK_SCORES.inc(reason="api_error")
+        return 5.0, f"Ошибка анализа: {str(e)}. Попробуем ещё раз? 😄", (None, None)
+    if score is None:
+        logger.warning("DeepSeek answer has no score, using 5.0")
+        metrics.FALLBACK_SCORES.inc(reason="no_score")
+        return 5.0, analysis, (None, None)
+    return score, analysis, hashes
 
 async def finish(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Завершение обработки вакансии и вывод shortlist."""
     user_id = update.effective_user.id
     logger.info(f"Received /finish from user {user_id}")
-    if not is_authorized_user(user_id):
+    if not await is_authorized_user(context, user_id):
         await update.message.reply_text("⛔ Доступ только для своих! 😄")
         return ConversationHandler.END
     vacancy_id = context.user_data.get("vacancy_id")
@@ -259,20 +510,14 @@ async def finish(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Вакансия не найдена! Начни заново с /add_vacancy! 😄")
         return ConversationHandler.END
     await update.message.reply_text("🎉 Поиск завершён! Вот топ-3 кандидатов, готовых сиять в твоей команде! 🌟")
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT resume_text, score, analysis FROM resumes WHERE vacancy_id = %s ORDER BY score DESC LIMIT 3",
-        (vacancy_id,)
-    )
-    shortlist = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with metrics.stage("finish", "db_query"):
+        shortlist = await get_db(context).resumes.top(vacancy_id, 3)
     if not shortlist:
         await update.message.reply_text("📭 Пока нет резюме для этой вакансии! Загрузи ещё! 😄")
         return ConversationHandler.END
-    for i, (resume, score, analysis) in enumerate(shortlist, 1):
-        await update.message.reply_text(f"🏆 Кандидат {i}:\nОценка: {score:.1f} ⭐\nАнализ: {analysis[:100]}...")
+    with metrics.stage("finish", "reply"):
+        for i, (score, analysis) in enumerate(shortlist, 1):
+            await update.message.reply_text(f"🏆 Кандидат {i}:\nОценка: {format_score(score)} ⭐\nАнализ: {analysis[:100]}...")
     context.user_data.clear()
     return ConversationHandler.END
 
@@ -280,41 +525,75 @@ async def admin_view(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Просмотр всех резюме для админов."""
     user_id = update.effective_user.id
     logger.info(f"Received /admin_view from user {user_id}")
-    if not is_authorized_user(user_id):
+    role = await get_user_role(context, user_id)
+    if not role:
         await update.message.reply_text("⛔ Только админ может заглянуть за кулисы! 😄")
         return
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT role FROM users WHERE telegram_id = %s", (user_id,))
-    role = cursor.fetchone()
-    if role and role[0] != 'Admin':
+    if role != 'Admin':
         await update.message.reply_text("⛔ Только админ имеет доступ! 👮‍♂️")
-        cursor.close()
-        conn.close()
         return
-    cursor.execute("SELECT vacancy_id, resume_text, score, analysis FROM resumes")
-    resumes = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    if not resumes:
+    with metrics.stage("admin_view", "db_query"):
+        text, keyboard = await render_admin_page(context)
+    if not text:
         await update.message.reply_text("📭 Пока нет резюме для просмотра! Добавь вакансии и резюме! 🌟")
         return
-    for resume in resumes:
-        await update.message.reply_text(f"🌟 Вакансия #{resume[0]}: Оценка {resume[2]:.1f}, Анализ: {resume[3][:100]}...")
+    with metrics.stage("admin_view", "reply"):
+        await update.message.reply_text(text, reply_markup=keyboard)
+
+async def render_admin_page(context: ContextTypes.DEFAULT_TYPE, cursor=None, newer=False):
+    """Текст и кнопки одной страницы /admin_view; (None, None), если страница пуста."""
+    resumes = get_db(context).resumes
+    limit = int(os.getenv("ADMIN_PAGE_SIZE", "10"))
+    rows, has_more = await resumes.page(cursor, newer, limit)
+    if newer and not has_more:
+        # Дошли до самых новых — показываем первую страницу целиком
+        cursor, newer = None, False
+        rows, has_more = await resumes.page(limit=limit)
+    if not rows:
+        return None, None
+    has_older = has_more if not newer else True
+    has_newer = has_more if newer else cursor is not None
+    text = "\n\n".join(
+        f"🌟 #{row['id']} · Вакансия #{row['vacancy_id']}: Оценка {format_score(row['score'])}, Анализ: {row['analysis']}..."
+        for row in rows
+    )[:4000]
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton("⬅️ Новее", callback_data=f"admin:newer:{rows[0]['id']}"))
+    if has_older:
+        buttons.append(InlineKeyboardButton("Старше ➡️", callback_data=f"admin:older:{rows[-1]['id']}"))
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
+
+async def admin_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Листание /admin_view кнопками."""
+    query = update.callback_query
+    if await get_user_role(context, query.from_user.id) != 'Admin':
+        await query.answer("⛔ Только админ имеет доступ! 👮‍♂️", show_alert=True)
+        return
+    _, direction, cursor = query.data.split(":")
+    with metrics.stage("admin_page", "db_query"):
+        text, keyboard = await render_admin_page(context, int(cursor), direction == "newer")
+    if not text:
+        await query.answer("📭 Дальше резюме нет!")
+        return
+    await query.answer()
+    await query.edit_message_text(text, reply_markup=keyboard)
 
 def setup_handlers(application: Application):
     """Регистрация обработчиков команд и ConversationHandler."""
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("add_user", add_user))
     application.add_handler(CommandHandler("admin_view", admin_view))
+    application.add_handler(CallbackQueryHandler(admin_page, pattern=r"^admin:(older|newer):\d+$"))
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("add_vacancy", add_vacancy)],
         states={
             VACANCY: [MessageHandler(filters.TEXT & ~filters.COMMAND, save_vacancy)],
             RESUME: [MessageHandler(filters.Document.ALL, handle_resume)],
             PROCESSING: [
-                CommandHandler("add_resume", add_vacancy),
-                CommandHandler("finish", finish)
+                CommandHandler("add_resume", add_resume),
+                CommandHandler("finish", finish),
+                MessageHandler(filters.Document.ALL, handle_resume)
             ]
         },
         fallbacks=[]
@@ -0,0 +1,108 @@
+import io
+import time
+import asyncio
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+ZIP_MIME_TYPES = {"application/zip", "application/x-zip-compressed", "multipart/x-zip"}
+
+
+def kind_from_name(name):
+    """Тип документа по имени файла: pdf, docx или None."""
+    name = name.lower()
+    if name.endswith(".pdf"):
+        return "pdf"
+    if name.endswith(".docx"):
+        return "docx"
+    return None
+
+
+def read_zip_documents(data, max_files=200, max_file_size=20 * 1024 * 1024, max_total_size=100 * 1024 * 1024):
+    """PDF/DOCX из ZIP-архива в памяти: список (имя, байты), всё прочее пропускается.
+
+    Размеры берутся из заголовков архива до распаковки (zipfile не читает больше заявленного),
+    max_total_size ограничивает распакованный объём всего архива.
+    """
+    documents = []
+    total_size = 0
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or not kind_from_name(name):
+                continue
+            if info.file_size > max_file_size:
+                logger.warning(f"Skipping {name} from archive: {info.file_size} bytes")
+                continue
+            if len(documents) >= max_files:
+                logger.warning(f"Archive has more than {max_files} documents, the rest are skipped")
+                break
+            if total_size + info.file_size > max_total_size:
+                logger.warning(f"Archive unpacks to more than {max_total_size} bytes, the rest are skipped")
+                break
+            total_size += info.file_size
+            documents.append((name.rsplit("/", 1)[-1], archive.read(info)))
+    return documents
+
+
+class MediaGroupCollector:
+    """Сбор документов одной медиагруппы Telegram, которые приходят отдельными апдейтами."""
+
+    def __init__(self, quiet_period=1.5, max_wait=15.0):
+        self.quiet_period = quiet_period
+        self.max_wait = max_wait
+        self._groups = {}
+
+    def add(self, group_id, document):
+        """Добавление документа; True, если группа новая и обрабатывать её должен вызывающий."""
+        group = self._groups.get(group_id)
+        if group is None:
+            self._groups[group_id] = {"documents": [document], "updated": time.monotonic()}
+            return True
+        group["documents"].append(document)
+        group["updated"] = time.monotonic()
+        return False
+
+    async def collect(self, group_id):
+        """Ожидание, пока в группу перестанут приходить документы; возвращает их все."""
+        started = time.monotonic()
+        group = self._groups[group_id]
+        while True:
+            now = time.monotonic()
+            idle = now - group["updated"]
+            if idle >= self.quiet_period or now - started >= self.max_wait:
+                break
+            await asyncio.sleep(self.quiet_period - idle)
+        return self._groups.pop(group_id)["documents"]
+
+
+async def process_batch(items, worker, concurrency=4, on_progress=None):
+    """Обработка items параллельно (не больше concurrency одновременно).
+
+    worker(item) возвращает результат или бросает исключение; on_progress(done, total)
+    вызывается после каждого элемента, его ошибки только логируются. Возвращает список (item, результат или исключение)
+    в исходном порядке.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(items)
+    done = 0
+
+    async def run(item):
+        nonlocal done
+        async with semaphore:
+            try:
+                result = await worker(item)
+            except Exception as e:
+                logger.error(f"Bulk item failed: {e}")
+                result = e
+        done += 1
+        if on_progress is not None:
+            try:
+                await on_progress(done, total)
+            except Exception as e:
+                # Прогресс — косметика: сбой правки сообщения не должен терять результаты пачки
+                logger.error(f"Bulk progress callback failed: {e}")
+        return item, result
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,279 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Счётчики ожидания и удержания соединений пула."""
+
+    def __init__(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+
+    def record_wait(self, seconds):
+        self.acquired += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def record_hold(self, seconds):
+        self.hold_total += seconds
+        self.hold_max = max(self.hold_max, seconds)
+
+    def as_dict(self):
+        return {
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+            "hold_avg_ms": round(self.hold_total / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "hold_max_ms": round(self.hold_max * 1000, 2),
+        }
+
+
+class Database:
+    """Общий асинхронный пул соединений PostgreSQL (один на Application)."""
+
+    def __init__(self, config, min_size=1, max_size=5, acquire_timeout=10.0,
+                 command_timeout=30.0, statement_cache_size=100, max_inactive_lifetime=300.0):
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.command_timeout = command_timeout
+        # 0 отключает подготовленные выражения (нужно за PgBouncer в режиме transaction)
+        self.statement_cache_size = statement_cache_size
+        self.max_inactive_lifetime = max_inactive_lifetime
+        self.stats = PoolStats()
+        self._pool = None
+        self._listener = None
+        self._lock = asyncio.Lock()
+        self.users = UserRepository(self)
+        self.vacancies = VacancyRepository(self)
+        self.resumes = ResumeRepository(self)
+
+    @classmethod
+    def from_env(cls):
+        """Создание пула по переменным окружения."""
+        config = {
+            "database": os.getenv("DB_NAME", "postgres"),
+            "user": os.getenv("DB_USER", "postgres"),
+            "password": os.getenv("DB_PASSWORD", ""),
+            "host": os.getenv("DB_HOST", "") or None,
+            "port": int(os.getenv("DB_PORT", "5432")),
+        }
+        return cls(
+            config,
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "5")),
+            acquire_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            command_timeout=float(os.getenv("DB_COMMAND_TIMEOUT", "30")),
+            statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+            max_inactive_lifetime=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+        )
+
+    async def connect(self):
+        """Ленивое создание пула (идемпотентно)."""
+        if self._pool is not None:
+            return self._pool
+        async with self._lock:
+            if self._pool is None:
+                import asyncpg
+                self._pool = await asyncpg.create_pool(
+                    **self.config,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    command_timeout=self.command_timeout,
+                    statement_cache_size=self.statement_cache_size,
+                    max_inactive_connection_lifetime=self.max_inactive_lifetime,
+                )
+                logger.info(f"✅ Database pool created (min={self.min_size}, max={self.max_size})")
+        return self._pool
+
+    async def listen(self, channel, callback):
+        """Подписка на LISTEN/NOTIFY через отдельное соединение вне пула."""
+        if self._listener is None or self._listener.is_closed():
+            import asyncpg
+            self._listener = await asyncpg.connect(**self.config, statement_cache_size=0)
+            self._listener.add_termination_listener(self._on_listener_closed)
+        await self._listener.add_listener(channel, callback)
+        logger.info(f"Listening for notifications on '{channel}'")
+
+    def _on_listener_closed(self, connection):
+        if connection is self._listener:
+            logger.warning("⚠️ LISTEN connection lost, notifications are missed until resubscribe")
+
+    def is_listening(self):
+        """Живо ли соединение LISTEN/NOTIFY."""
+        return self._listener is not None and not self._listener.is_closed()
+
+    async def close(self):
+        """Закрытие пула."""
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            await listener.close()
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+            logger.info("Database pool closed")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Выдача соединения из пула с учётом времени ожидания."""
+        pool = await self.connect()
+        started = time.perf_counter()
+        try:
+            conn = await pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            logger.error(f"❌ Database pool exhausted: no connection within {self.acquire_timeout}s")
+            raise
+        acquired = time.perf_counter()
+        self.stats.record_wait(acquired - started)
+        try:
+            yield conn
+        finally:
+            self.stats.record_hold(time.perf_counter() - acquired)
+            await pool.release(conn)
+
+    def pool_stats(self):
+        """Состояние пула и времена ожидания соединений."""
+        stats = self.stats.as_dict()
+        if self._pool is not None:
+            stats["size"] = self._pool.get_size()
+            stats["idle"] = self._pool.get_idle_size()
+        else:
+            stats["size"] = stats["idle"] = 0
+        stats["max_size"] = self.max_size
+        return stats
+
+    async def fetch(self, query, *args):
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args)
+
+    async def fetchrow(self, query, *args):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def fetchval(self, query, *args):
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args)
+
+    async def execute(self, query, *args):
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args)
+
+
+class UserRepository:
+    """Пользователи и их роли."""
+
+    # Канал NOTIFY, по которому другие инстансы узнают о смене ролей
+    CHANNEL = "user_roles"
+
+    def __init__(self, db):
+        self.db = db
+
+    async def get_role(self, telegram_id):
+        return await self.db.fetchval("SELECT role FROM users WHERE telegram_id = $1", telegram_id)
+
+    async def add(self, telegram_id, role):
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "INSERT INTO users (telegram_id, role) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+                    telegram_id, role
+                )
+                await conn.execute("SELECT pg_notify($1, $2)", self.CHANNEL, str(telegram_id))
+
+
+class VacancyRepository:
+    """Вакансии."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def create(self, user_id, vacancy_data):
+        return await self.db.fetchval(
+            "INSERT INTO vacancies (user_id, vacancy_data) VALUES ($1, $2) RETURNING id",
+            user_id, vacancy_data
+        )
+
+
+class ResumeRepository:
+    """Резюме и их оценки."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def add(self, vacancy_id, user_id, resume_text, score, analysis,
+                  resume_hash=None, vacancy_hash=None, local_score=None):
+        return await self.db.fetchval(
+            "INSERT INTO resumes (vacancy_id, user_id, resume_text, score, analysis, resume_hash, vacancy_hash, local_score) "
+            "VALUES ($1, $2, $3, $4, $5, $6, $7, $8) RETURNING id",
+            vacancy_id, user_id, resume_text, score, analysis, resume_hash, vacancy_hash, local_score
+        )
+
+    async def add_many(self, vacancy_id, user_id, rows):
+        """Пакетная вставка одним запросом; возвращает id в порядке rows.
+
+        rows — кортежи (resume_text, score, analysis, resume_hash, vacancy_hash, local_score).
+        """
+        if not rows:
+            return []
+        texts, scores, analyses, resume_hashes, vacancy_hashes, local_scores = zip(*rows)
+        records = await self.db.fetch(
+            "INSERT INTO resumes (vacancy_id, user_id, resume_text, score, analysis, resume_hash, vacancy_hash, local_score) "
+            "SELECT $1, $2, t.resume_text, t.score, t.analysis, t.resume_hash, t.vacancy_hash, t.local_score "
+            "FROM unnest($3::text[], $4::float8[], $5::text[], $6::text[], $7::text[], $8::float8[]) "
+            "WITH ORDINALITY AS t(resume_text, score, analysis, resume_hash, vacancy_hash, local_score, ord) "
+            "ORDER BY t.ord RETURNING id",
+            vacancy_id, user_id, list(texts), list(scores), list(analyses),
+            list(resume_hashes), list(vacancy_hashes), list(local_scores)
+        )
+        return [record["id"] for record in records]
+
+    async def update_text(self, resume_id, resume_text):
+        await self.db.execute("UPDATE resumes SET resume_text = $2 WHERE id = $1", resume_id, resume_text)
+
+    async def find_analysis(self, resume_hash, vacancy_hash):
+        """Ранее полученная оценка для того же резюме и вакансии."""
+        return await self.db.fetchrow(
+            "SELECT score, analysis FROM resumes WHERE resume_hash = $1 AND vacancy_hash = $2 AND score IS NOT NULL "
+            "ORDER BY id DESC LIMIT 1",
+            resume_hash, vacancy_hash
+        )
+
+    async def top(self, vacancy_id, limit=3, preview=100):
+        """Лучшие резюме вакансии (индекс resumes_vacancy_score_idx), только оценка и начало анализа."""
+        return await self.db.fetch(
+            "SELECT score, left(analysis, $3) AS analysis FROM resumes WHERE vacancy_id = $1 "
+            "ORDER BY score DESC NULLS LAST, local_score DESC NULLS LAST LIMIT $2",
+            vacancy_id, limit, preview
+        )
+
+    async def page(self, cursor=None, newer=False, limit=10, preview=100):
+        """Страница резюме с пагинацией по ключу id, от новых к старым.
+
+        cursor — id, от которого идём: к более старым (newer=False) или к более новым (newer=True).
+        Возвращает (строки, есть ли ещё строки в направлении движения).
+        """
+        columns = "id, vacancy_id, score, left(analysis, $1) AS analysis"
+        if cursor is None:
+            rows = await self.db.fetch(f"SELECT {columns} FROM resumes ORDER BY id DESC LIMIT $2", preview, limit + 1)
+        elif newer:
+            rows = await self.db.fetch(
+                f"SELECT {columns} FROM resumes WHERE id > $3 ORDER BY id ASC LIMIT $2", preview, limit + 1, cursor
+            )
+            return list(reversed(rows[:limit])), len(rows) > limit
+        else:
+            rows = await self.db.fetch(
+                f"SELECT {columns} FROM resumes WHERE id < $3 ORDER BY id DESC LIMIT $2", preview, limit + 1, cursor
+            )
+        return rows[:limit], len(rows) > limit
@@ -0,0 +1,206 @@
+import io
+import os
+import time
+import asyncio
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+_background_tasks = set()
+
+
+class ExtractionStats:
+    """Время извлечения текста по файлам."""
+
+    def __init__(self):
+        self.files = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def record(self, seconds):
+        self.files += 1
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+
+    def as_dict(self):
+        return {
+            "files": self.files,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_ms": round(self.seconds_total / self.files * 1000, 1) if self.files else 0.0,
+            "max_ms": round(self.seconds_max * 1000, 1),
+        }
+
+
+stats = ExtractionStats()
+
+
+def extract_text(data, kind, limit=None):
+    """Текст PDF или DOCX из байтов; при limit разбор останавливается, как только набрано limit символов.
+
+    Возвращает (text, truncated), truncated=True — документ разобран не полностью.
+    """
+    parts = []
+    size = 0
+    # Тяжёлые парсеры импортируются только в процессе, который разбирает документы
+    if kind == "pdf":
+        from PyPDF2 import PdfReader
+        pages = PdfReader(io.BytesIO(data)).pages
+        chunks = (page.extract_text() or "" for page in pages)
+        total = len(pages)
+    elif kind == "docx":
+        from docx import Document
+        paragraphs = Document(io.BytesIO(data)).paragraphs
+        chunks = (paragraph.text or "" for paragraph in paragraphs)
+        total = len(paragraphs)
+    else:
+        return "", False
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk) + 1
+        if limit is not None and size >= limit:
+            break
+    return " ".join(parts), len(parts) < total
+
+
+class _WorkerPool:
+    """Пул процессов для разбора документов.
+
+    Задания ждут свободный процесс на семафоре, поэтому таймаут считается только от начала разбора.
+    Процессы пула с зависшим разбором убиваются, пул пересоздаётся. workers=0 или недоступный
+    пул процессов (нет /dev/shm в serverless-песочнице) — разбор в потоках.
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.semaphore = asyncio.Semaphore(workers) if workers > 0 else nullcontext()
+        self.threads = workers <= 0
+        self.executor = None
+        self.generation = 0
+
+    def _get_executor(self):
+        if self.threads:
+            return None
+        if self.executor is None:
+            try:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            except (OSError, NotImplementedError) as e:
+                self._use_threads(e)
+        return self.executor
+
+    def _use_threads(self, error):
+        logger.warning(f"Process pool '{self.name}' unavailable ({error}), extracting in threads")
+        self.threads = True
+        self.executor = None
+
+    def _kill(self):
+        """Остановка пула вместе с зависшими процессами; следующий вызов создаст новый пул."""
+        executor, self.executor = self.executor, None
+        if executor is None:
+            return
+        self.generation += 1
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        # Без cancel_futures: остальные задания получат BrokenProcessPool и повторятся в новом пуле
+        executor.shutdown(wait=False)
+
+    async def run(self, timeout, func, *args):
+        """func(*args) в пуле; TimeoutError, если сам разбор дольше timeout секунд."""
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            for attempt in range(2):
+                executor, generation = self._get_executor(), self.generation
+                future = None
+                if executor is not None:
+                    try:
+                        future = asyncio.wrap_future(executor.submit(func, *args))
+                    except (OSError, NotImplementedError) as e:
+                        self._use_threads(e)
+                        executor = None
+                if future is None:
+                    future = loop.run_in_executor(None, func, *args)
+                started = time.perf_counter()
+                try:
+                    return await asyncio.wait_for(future, timeout), time.perf_counter() - started
+                except asyncio.TimeoutError:
+                    if executor is not None and executor is self.executor:
+                        self._kill()
+                    raise
+                except BrokenProcessPool:
+                    if executor is self.executor:
+                        self.executor = None
+                    # Пул убит из-за чужого таймаута — разбираем заново; сбой на этом файле — ошибка
+                    if generation == self.generation or attempt:
+                        raise
+
+    def shutdown(self):
+        self._kill()
+
+
+_pools = {}
+
+
+def _get_pool(background=False):
+    """Пул для оценки резюме (EXTRACT_WORKERS) или отдельный для фонового полного текста."""
+    name = "background" if background else "scoring"
+    if name not in _pools:
+        workers = os.getenv("EXTRACT_BACKGROUND_WORKERS", "1") if background else os.getenv("EXTRACT_WORKERS", "2")
+        _pools[name] = _WorkerPool(name, int(workers))
+    return _pools[name]
+
+
+async def extract(data, kind, limit=None, background=False):
+    """Извлечение текста вне event loop с таймаутом на разбор; при ошибке — ("", False).
+
+    background=True — низкоприоритетный разбор в своём пуле (EXTRACT_BACKGROUND_TIMEOUT),
+    чтобы дочитывание полных текстов не задерживало оценку новых резюме.
+    """
+    if background:
+        timeout = float(os.getenv("EXTRACT_BACKGROUND_TIMEOUT", "60"))
+    else:
+        timeout = float(os.getenv("EXTRACT_TIMEOUT", "20"))
+    try:
+        result, elapsed = await _get_pool(background).run(timeout, extract_text, data, kind, limit)
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+        logger.error(f"Text extraction timed out after {timeout}s ({kind}, {len(data)} bytes)")
+        return "", False
+    except BrokenProcessPool as e:
+        stats.errors += 1
+        logger.error(f"Extraction worker crashed: {e}")
+        return "", False
+    except Exception as e:
+        stats.errors += 1
+        logger.error(f"Error extracting text: {e}")
+        return "", False
+    stats.record(elapsed)
+    logger.info(f"Extracted {len(result[0])} chars from {kind} ({len(data)} bytes) in {elapsed * 1000:.0f} ms")
+    return result
+
+
+def store_full_text_later(db, resume_id, data, kind):
+    """Фоновое извлечение полного текста для уже сохранённого резюме."""
+    async def run():
+        text, _ = await extract(data, kind, background=True)
+        if text:
+            try:
+                await db.resumes.update_text(resume_id, text)
+            except Exception as e:
+                logger.error(f"Failed to store full text of resume {resume_id}: {e}")
+
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def shutdown():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
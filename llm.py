@@ -0,0 +1,320 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import logging
+
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+# Сколько символов резюме попадает в промпт
+PROMPT_RESUME_CHARS = 2000
+
+
+class LLMError(Exception):
+    """Ошибка обращения к LLM после исчерпания повторов."""
+
+
+class TokenBucket:
+    """Асинхронный token bucket: rate запросов в секунду, всплеск до capacity."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Ожидание свободного токена; возвращает время ожидания в секундах."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= 1
+        return waited
+
+
+# Один лимитер на процесс: лимиты DeepSeek считаются по ключу, а не по Application
+_rate_limiter = None
+
+
+def get_rate_limiter(rate, capacity=None):
+    """Общий для процесса token bucket."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = TokenBucket(rate, capacity)
+    return _rate_limiter
+
+
+def build_prompt(resume_text, vacancy_data):
+    """Промпт для оценки резюме."""
+    return (
+        f"Анализируй резюме: {resume_text[:PROMPT_RESUME_CHARS]}\n"
+        f"Вакансия: {vacancy_data}\n"
+        f"Оцени по шкале от 0 до 10 с одним десятичным знаком (например, 7.5) и дай краткий анализ (2-3 предложения) с позитивным настроением! 😄"
+    )
+
+
+SCORE_PATTERN = re.compile(r"\b\d+\.\d\b")
+
+
+def find_score(partial_response):
+    """Оценка из начала ответа, пока он ещё стримится; None, если её пока нет.
+
+    Число в самом конце текста не засчитывается: следующий фрагмент может его продолжить.
+    """
+    match = SCORE_PATTERN.search(partial_response)
+    if match and match.end() < len(partial_response):
+        return float(match.group())
+    return None
+
+
+def extract_score(gpt_response):
+    """Извлечение оценки из ответа DeepSeek; None, если оценки в ответе нет."""
+    match = SCORE_PATTERN.search(gpt_response)
+    return float(match.group()) if match else None
+
+
+def _retry_after(response):
+    """Значение заголовка Retry-After в секундах (если оно задано числом)."""
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class DeepSeekClient:
+    """Неблокирующий клиент DeepSeek с общим пулом соединений, лимитом скорости и повторами."""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, model="deepseek-chat", timeout=60.0,
+                 connect_timeout=5.0, max_retries=3, backoff_base=0.5, backoff_max=20.0,
+                 max_concurrency=8, rate_limiter=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = None
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @classmethod
+    def from_env(cls):
+        """Клиент по переменным окружения."""
+        return cls(
+            os.getenv("DEEPSEEK_API_KEY"),
+            base_url=os.getenv("DEEPSEEK_BASE_URL", DEFAULT_BASE_URL),
+            model=os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
+            timeout=float(os.getenv("DEEPSEEK_TIMEOUT", "60")),
+            connect_timeout=float(os.getenv("DEEPSEEK_CONNECT_TIMEOUT", "5")),
+            max_retries=int(os.getenv("DEEPSEEK_MAX_RETRIES", "3")),
+            max_concurrency=int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "8")),
+            rate_limiter=get_rate_limiter(
+                float(os.getenv("DEEPSEEK_RATE_LIMIT", "5")),
+                float(os.getenv("DEEPSEEK_RATE_BURST", "0")) or None
+            ),
+        )
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt, response=None):
+        """Пауза перед повтором: Retry-After или экспоненциальная задержка с джиттером."""
+        if response is not None:
+            retry_after = _retry_after(response)
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _post(self, payload):
+        """POST /chat/completions с ограничением параллелизма, скорости и повторами."""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                for attempt in range(self.max_retries + 1):
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire()
+                    self.requests += 1
+                    try:
+                        response = await self.client.post("/chat/completions", json=payload)
+                    except httpx.TransportError as e:
+                        if attempt == self.max_retries:
+                            self.errors += 1
+                            raise LLMError(f"DeepSeek request failed: {e}") from e
+                        delay = self._backoff(attempt)
+                        logger.warning(f"DeepSeek transport error ({e}), retry in {delay:.1f}s")
+                    else:
+                        if response.status_code not in self.RETRY_STATUSES:
+                            if response.is_error:
+                                self.errors += 1
+                                raise LLMError(f"DeepSeek HTTP {response.status_code}: {response.text[:200]}")
+                            return response.json()
+                        if attempt == self.max_retries:
+                            self.errors += 1
+                            raise LLMError(f"DeepSeek HTTP {response.status_code} after {attempt + 1} attempts")
+                        delay = self._backoff(attempt, response)
+                        logger.warning(f"DeepSeek HTTP {response.status_code}, retry in {delay:.1f}s")
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+            finally:
+                self.in_flight -= 1
+
+    async def complete(self, prompt):
+        """Ответ модели на один пользовательский промпт."""
+        result = await self._post({
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+        })
+        usage = result.get("usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        try:
+            return result["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            self.errors += 1
+            raise LLMError(f"Unexpected DeepSeek response: {result!r:.200}") from e
+
+    async def stream(self, prompt):
+        """Ответ модели по фрагментам из SSE-потока ("stream": true).
+
+        Повторы — только пока не пришёл первый фрагмент; обрыв потока после него — LLMError.
+        """
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        async with self._semaphore:
+            self.in_flight += 1
+            started = time.perf_counter()
+            received = False
+            try:
+                for attempt in range(self.max_retries + 1):
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire()
+                    self.requests += 1
+                    response = None
+                    try:
+                        async with self.client.stream("POST", "/chat/completions", json=payload) as response:
+                            if response.status_code not in self.RETRY_STATUSES:
+                                if response.is_error:
+                                    await response.aread()
+                                    self.errors += 1
+                                    raise LLMError(f"DeepSeek HTTP {response.status_code}: {response.text[:200]}")
+                                async for delta in self._read_events(response):
+                                    if not received:
+                                        received = True
+                                        metrics.STAGE_SECONDS.observe(
+                                            time.perf_counter() - started, handler="llm", stage="first_token"
+                                        )
+                                    yield delta
+                                return
+                    except httpx.TransportError as e:
+                        if received or attempt == self.max_retries:
+                            self.errors += 1
+                            raise LLMError(f"DeepSeek stream failed: {e}") from e
+                        delay = self._backoff(attempt)
+                        logger.warning(f"DeepSeek transport error ({e}), retry in {delay:.1f}s")
+                    else:
+                        if attempt == self.max_retries:
+                            self.errors += 1
+                            raise LLMError(f"DeepSeek HTTP {response.status_code} after {attempt + 1} attempts")
+                        delay = self._backoff(attempt, response)
+                        logger.warning(f"DeepSeek HTTP {response.status_code}, retry in {delay:.1f}s")
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+            finally:
+                self.in_flight -= 1
+
+    async def _read_events(self, response):
+        """Текстовые фрагменты из событий SSE `data: {...}` до `data: [DONE]`."""
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            try:
+                event = json.loads(data)
+            except ValueError as e:
+                self.errors += 1
+                raise LLMError(f"Unexpected DeepSeek stream event: {data[:200]}") from e
+            usage = event.get("usage") or {}
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            for choice in event.get("choices") or []:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield content
+
+    async def analyze(self, resume_text, vacancy_data):
+        """(оценка или None, анализ); LLMError при неудаче."""
+        result = await self.complete(build_prompt(resume_text, vacancy_data))
+        return extract_score(result), result
+
+    async def analyze_stream(self, resume_text, vacancy_data, on_partial):
+        """Как analyze, но по мере генерации вызывает await on_partial(текст, оценка или None)."""
+        result = ""
+        async for delta in self.stream(build_prompt(resume_text, vacancy_data)):
+            result += delta
+            await on_partial(result, find_score(result))
+        if not result:
+            self.errors += 1
+            raise LLMError("DeepSeek stream ended without content")
+        return extract_score(result), result
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
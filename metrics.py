@@ -0,0 +1,162 @@
+import time
+import bisect
+from contextlib import nullcontext
+
+# Метрики процесса в текстовом формате Prometheus; при METRICS_ENABLED=0 все вызовы — no-op
+_enabled = True
+_metrics = []
+_stats_sources = []
+_NOOP = nullcontext()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def configure(enabled):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if _enabled:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        if _enabled:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        if _enabled:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            # счётчики по корзинам (последняя — +Inf) и сумма
+            series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("handler", "stage", "started")
+
+    def __init__(self, handler, stage):
+        self.handler = handler
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, handler=self.handler, stage=self.stage)
+        return False
+
+
+def stage(handler, name):
+    """Контекстный менеджер: время этапа name обработчика handler в hrbot_stage_seconds."""
+    return _Timer(handler, name) if _enabled else _NOOP
+
+
+def register_stats(prefix, source, counters=()):
+    """Экспорт словаря чисел source() как метрик hrbot_<prefix>_<ключ>; ключи из counters — счётчики."""
+    _stats_sources.append((prefix, source, set(counters)))
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for prefix, source, counters in _stats_sources:
+        try:
+            stats = source()
+        except Exception:
+            continue
+        for key, value in stats.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            name = f"hrbot_{prefix}_{key}" + ("_total" if key in counters else "")
+            lines.append(f"# TYPE {name} {'counter' if key in counters else 'gauge'}")
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("hrbot_stage_seconds", "Duration of handler stages", ("handler", "stage"))
+UPDATES_IN_FLIGHT = Gauge("hrbot_updates_in_flight", "Telegram updates being processed right now")
+UPDATES_TOTAL = Counter("hrbot_updates_total", "Telegram updates processed", ("status",))
+FALLBACK_SCORES = Counter("hrbot_fallback_scores_total", "Resumes that got the default 5.0 score", ("reason",))
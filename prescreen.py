@@ -0,0 +1,66 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-zа-яё0-9][a-zа-яё0-9+#]*")
+# Грубый стемминг усечением: "разработчика" и "разработчик" дают один терм
+STEM_LENGTH = 7
+STOPWORDS = {"и", "в", "на", "с", "по", "для", "от", "до", "из", "или", "не", "знание", "опыт", "and", "or", "the", "of", "with"}
+
+
+def tokenize(text):
+    """Термы текста: нижний регистр, без стоп-слов, усечённые до STEM_LENGTH символов."""
+    return [token[:STEM_LENGTH] for token in TOKEN_RE.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class VacancyCorpus:
+    """Статистика BM25 по всем резюме одной вакансии; считаются только термы требований."""
+
+    def __init__(self, requirements, k1=1.5, b=0.75):
+        self.terms = sorted(set(tokenize(requirements)))
+        self.index = {term: i for i, term in enumerate(self.terms)}
+        self.k1 = k1
+        self.b = b
+        self.documents = 0
+        self.total_length = 0
+        self.document_frequency = np.zeros(len(self.terms), dtype=np.int64)
+
+    def term_counts(self, texts):
+        """Матрица (документы × термы требований) с частотами и вектор длин документов."""
+        counts = np.zeros((len(texts), len(self.terms)), dtype=np.float64)
+        lengths = np.zeros(len(texts), dtype=np.float64)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for term, count in Counter(tokens).items():
+                column = self.index.get(term)
+                if column is not None:
+                    counts[row, column] = count
+        return counts, lengths
+
+    def add_and_score(self, texts):
+        """Добавление документов в корпус и их оценки BM25 по обновлённой статистике."""
+        if not texts:
+            return np.zeros(0)
+        counts, lengths = self.term_counts(texts)
+        self.documents += len(texts)
+        self.total_length += int(lengths.sum())
+        self.document_frequency += (counts > 0).sum(axis=0)
+        if not self.terms:
+            return np.zeros(len(texts))
+        df = self.document_frequency
+        idf = np.log1p((self.documents - df + 0.5) / (df + 0.5))
+        average_length = max(self.total_length / self.documents, 1.0)
+        norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        return (idf * counts * (self.k1 + 1) / (counts + norm[:, None])).sum(axis=1)
+
+
+def select_for_llm(scores, top_k, min_score=0.0):
+    """Индексы документов, которые стоит отправить в LLM: top_k лучших с оценкой не ниже min_score."""
+    order = np.argsort(-scores, kind="stable")
+    if min_score > 0:
+        order = order[scores[order] >= min_score]
+    if top_k > 0:
+        order = order[:top_k]
+    return set(order.tolist())
@@ -0,0 +1,52 @@
+import time
+import asyncio
+import logging
+
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressMessage:
+    """Одно сообщение, которое редактируется не чаще interval секунд (лимиты Telegram на правки)."""
+
+    def __init__(self, message, interval=2.0):
+        self.message = message
+        self.interval = interval
+        self.text = message.text
+        self._last_edit = 0.0
+        self._blocked_until = 0.0
+
+    @classmethod
+    async def send(cls, reply_to, text, interval=2.0):
+        """Отправка исходного сообщения в ответ на reply_to."""
+        return cls(await reply_to.reply_text(text), interval)
+
+    async def update(self, text, force=False, bypass_interval=False):
+        """Правка текста; промежуточные правки пропускаются, force — гарантированная (финальная).
+
+        bypass_interval — правка вне интервала троттлинга, но без ожидания при RetryAfter
+        (для важных промежуточных правок, которые не должны задерживать вызывающего).
+        """
+        now = time.monotonic()
+        if text == self.text:
+            return False
+        throttled = not bypass_interval and now - self._last_edit < self.interval
+        if not force and (throttled or now < self._blocked_until):
+            return False
+        try:
+            await self.message.edit_text(text)
+        except RetryAfter as e:
+            self._blocked_until = now + e.retry_after
+            logger.warning(f"Progress edit throttled by Telegram for {e.retry_after}s")
+            if not force:
+                return False
+            await asyncio.sleep(e.retry_after)
+            return await self.update(text, force=True)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.error(f"Progress edit failed: {e}")
+            return False
+        self.text = text
+        self._last_edit = time.monotonic()
+        return True
@@ -21,3 +21,19 @@ CREATE TABLE resumes (
     analysis TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Миграции (идемпотентны, применяются поверх существующей базы)
+
+-- Кэш анализа по хешу нормализованного содержимого резюме и вакансии
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_hash CHAR(64);
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS vacancy_hash CHAR(64);
+CREATE INDEX IF NOT EXISTS resumes_content_hash_idx ON resumes (resume_hash, vacancy_hash);
+
+-- Локальный BM25-отбор: отсеянные резюме хранятся без оценки LLM
+ALTER TABLE resumes ADD COLUMN IF NOT EXISTS local_score FLOAT;
+ALTER TABLE resumes ALTER COLUMN score DROP NOT NULL;
+
+-- Индексы для shortlist в /finish и выборок по пользователю
+CREATE INDEX IF NOT EXISTS resumes_vacancy_score_idx
+    ON resumes (vacancy_id, score DESC NULLS LAST, local_score DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS vacancies_user_id_idx ON vacancies (user_id);
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """Ограниченное хранилище недавно принятых update_id (Telegram повторяет апдейт при таймауте)."""
+
+    def __init__(self, maxsize=10000, ttl=3600.0):
+        self._seen = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.duplicates = 0
+
+    def seen(self, update_id):
+        """True, если апдейт уже принимался; иначе запоминает его."""
+        if self._seen.get(update_id):
+            self.duplicates += 1
+            return True
+        self._seen.set(update_id, True)
+        return False
+
+    def forget(self, update_id):
+        """Разрешить повторную доставку (апдейт не удалось принять в обработку)."""
+        self._seen.invalidate(update_id)
+
+
+class UpdateQueue:
+    """Ограниченные очереди апдейтов и пул воркеров, который их обрабатывает.
+
+    У каждого воркера своя очередь, апдейт попадает в неё по ключу (чату): апдейты одного чата
+    обрабатываются строго по порядку, разные чаты — параллельно.
+    """
+
+    def __init__(self, handler, workers=4, maxsize=100):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queues = [asyncio.Queue(maxsize=max(1, -(-maxsize // workers))) for _ in range(workers)]
+        self._tasks = []
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            logger.info(f"Started {self.workers} update workers (queue size {self.maxsize})")
+
+    async def stop(self, timeout=10.0):
+        """Дообработка очереди (не дольше timeout) и остановка воркеров."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping with {self.queued()} unprocessed updates")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, item, key=0):
+        """Постановка в очередь воркера для key без ожидания; False, если очередь заполнена."""
+        try:
+            self._queues[hash(key) % self.workers].put_nowait(item)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        return True
+
+    async def _worker(self, number):
+        queue = self._queues[number]
+        while True:
+            item = await queue.get()
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Update worker {number} failed: {e}")
+            finally:
+                queue.task_done()
+
+    def queued(self):
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self):
+        return {
+            "queued": self.queued(),
+            "maxsize": self.maxsize,
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }